@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Resolve many two-car cases at once, for offline tools.
+# Needs NumPy, which the app itself does not.
+#
+# Inputs are integer codes:
+#   right-of-way: 0 (no) or 1 (yes)
+#   turn: index in yield_resolver.valid_turns
+#   relative position: index in yield_resolver.directions
+# Reason codes are indices in yield_resolver.reasons (0 is None).
+
+import numpy as np
+
+from yield_resolver import directions, valid_turns, reasons, _decision_table
+
+
+def _build_tables():
+    """Lay out the decision table as arrays indexed by the input codes"""
+
+    shape = (2, len(valid_turns), 2, len(valid_turns), len(directions))
+    yields = np.zeros(shape, dtype=bool)
+    reason_codes = np.zeros(shape, dtype=np.uint8)
+
+    for args, (must, reason) in _decision_table.items():
+        my_row, my_turn, other_row, other_turn, position = args
+        index = (
+            int(my_row),
+            valid_turns.index(my_turn),
+            int(other_row),
+            valid_turns.index(other_turn),
+            directions.index(position)
+        )
+        yields[index] = must
+        reason_codes[index] = reasons.index(reason)
+
+    return yields, reason_codes
+
+
+_yield_table, _reason_table = _build_tables()
+
+
+def _as_codes(values, count, name):
+    codes = np.asarray(values, dtype=np.intp)
+    if np.any((codes < 0) | (codes >= count)):
+        raise ValueError(f'{name} codes must be between 0 and {count-1}!')
+    return codes
+
+
+def must_yield_batch(my_row, my_turn, other_row, other_turn, rel_pos):
+    """
+        Vectorized `yield_resolver.must_yield`: every argument is an array
+    (or scalar) of integer codes, and they are broadcast together.
+
+        Returns a boolean array (whether we must yield), and an array of
+    reason codes (indices in `yield_resolver.reasons`).
+
+    >>> must, why = must_yield_batch([0, 1], [2, 1], [0, 1], [1, 0], [2, 3])
+    >>> must.tolist()
+    [False, False]
+    >>> why.tolist()
+    [0, 0]
+
+    Same right-of-way, other car on the right: yield to it
+    >>> must, why = must_yield_batch(1, 0, 1, 0, 1)
+    >>> bool(must), reasons[why]
+    (True, 'The car on your right has the same right-of-way status,\\nand you have to yield.')
+
+    Matches the scalar resolver for every case
+    >>> from yield_resolver import must_yield
+    >>> codes = np.indices(_yield_table.shape).reshape(5, -1)
+    >>> must, why = must_yield_batch(*codes)
+    >>> all(
+    ...     must_yield(
+    ...         bool(a), valid_turns[b], bool(c), valid_turns[d], directions[e]
+    ...     ) == (m, reasons[w])
+    ...     for a, b, c, d, e, m, w in zip(*codes, must, why)
+    ... )
+    True
+
+    >>> must_yield_batch(0, 3, 0, 0, 0)
+    Traceback (most recent call last):
+     ...
+    ValueError: Turn codes must be between 0 and 2!
+    """
+
+    index = (
+        _as_codes(my_row, 2, 'Right-of-way'),
+        _as_codes(my_turn, len(valid_turns), 'Turn'),
+        _as_codes(other_row, 2, 'Right-of-way'),
+        _as_codes(other_turn, len(valid_turns), 'Turn'),
+        _as_codes(rel_pos, len(directions), 'Relative position'),
+    )
+
+    return _yield_table[index], _reason_table[index]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Time the hot spots of the game, so we notice when they get slower.
+#
+# Usage:
+#   python benchmarks.py [--output results.json] [--compare old.json]
+#                        [--seed 0] [--no-kivy]
+#   python benchmarks.py --soak 5000
+#
+# Results are in calls (or frames, or turns) per second; higher is better.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+from time import perf_counter, time
+
+from yield_resolver import (
+    must_yield, paths_intersect, relative_position, directions, valid_turns
+)
+from scenarios import ScenarioIndex
+from scenario_bank import ScenarioBank
+from simulation import Simulation, autoplay
+from replay import VirtualClock
+
+
+def _rate(function, arguments, repeat=5):
+    """
+        Call `function` once per item of `arguments` (tuples), `repeat` times.
+
+        Returns the best rate, in calls per second.
+    """
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        for args in arguments:
+            function(*args)
+        best = min(best, perf_counter() - start)
+
+    return len(arguments) / best
+
+
+def bench_resolver(rng, count=100000):
+    """Rates of the two-car resolver functions"""
+
+    must_yield_args = [
+        (
+            rng.choice([False, True]), rng.choice(valid_turns),
+            rng.choice([False, True]), rng.choice(valid_turns),
+            rng.choice(directions)
+        )
+        for _ in range(count)
+    ]
+    paths_args = [(args[1], args[4], args[3]) for args in must_yield_args]
+    position_args = [
+        (rng.choice(directions), rng.choice(directions)) for _ in range(count)
+    ]
+
+    return {
+        'must_yield': _rate(must_yield, must_yield_args),
+        'paths_intersect': _rate(paths_intersect, paths_args),
+        'relative_position': _rate(relative_position, position_args),
+    }
+
+
+def bench_simulation(rng, turns=20000):
+    """Rate of whole turns played without graphics"""
+
+    simulation = Simulation(rng=rng)
+
+    start = perf_counter()
+    autoplay(simulation, turns)
+    return {'simulation_turns': turns / (perf_counter() - start)}
+
+
+def bench_scenarios(repeat=20):
+    """Rates of getting all scenarios ready: resolved, or from the bank"""
+
+    def bank():
+        ScenarioBank().close()
+
+    return {
+        'scenario_index': _rate(ScenarioIndex, [()] * repeat),
+        'scenario_bank': _rate(bank, [()] * repeat),
+    }
+
+
+def _kivy_game(rng):
+    """A game in an offscreen-capable Kivy window, without running the app"""
+
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+    # The window must exist before any texture is loaded
+    from kivy.core.window import Window  # noqa: F401
+    import main
+
+    app = main.YieldOrDieApp()
+    app.scenarios = main.scenario_bank.load()[0]
+    app.textures = main.TextureRegistry()
+    # Cars move the same on every machine
+    app.game = main.YieldOrDieGame(
+        app=app, seed=rng.randrange(2**32), clock=VirtualClock()
+    )
+    app.game.size = (540, 960)
+
+    return app.game
+
+
+def _play_turn(game, frames=1):
+    """Decide the current turn, draw a few frames, and go to the next one"""
+
+    game.intersection.turn.decide('go')
+    for _ in range(frames):
+        game.clock.advance(1 / 40)
+        game.update(1 / 40)
+    game.next_turn()
+
+
+def bench_kivy(rng, setups=200, frames=2000):
+    """Rates of intersection setup and of frame updates, in a Kivy window"""
+
+    game = _kivy_game(rng)
+    game.start()
+
+    start = perf_counter()
+    for _ in range(setups):
+        _play_turn(game, frames=0)
+    setup_rate = setups / (perf_counter() - start)
+
+    game.update(0)
+    start = perf_counter()
+    for _ in range(frames):
+        game.clock.advance(1 / 40)
+        game.update(1 / 40)
+    frame_rate = frames / (perf_counter() - start)
+
+    return {'intersection_setup': setup_rate, 'frame_update': frame_rate}
+
+
+def _rss_kb():
+    """Current resident memory, where /proc is available (Linux, Android)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return None
+
+
+def _drawn_widgets(game):
+    """Widgets on screen: cars, and what the static layer shows"""
+    return sum(
+        len(layer.children)
+        for layer in [game, game.cars, game.static.scene]
+    )
+
+
+def soak(rng, turns=5000, warmup=2000):
+    """
+        Play many turns, and see whether widgets or memory pile up.
+
+        Returns the most widgets drawn in a turn, the widgets built,
+    and resident memory (in KiB), after warming up and at the end.
+    The warm-up is long because the OpenGL driver keeps growing its own
+    buffers for the static layer's offscreen renders, for the first couple
+    thousand turns.
+
+    A few hundred turns must not leave more widgets behind, or build more:
+
+    >>> result = soak(random.Random(0), turns=300, warmup=100)
+    >>> before, after = result['before'], result['after']
+    >>> after['children'] <= before['children']
+    True
+    >>> after['widgets_built'] == before['widgets_built']
+    True
+    """
+
+    game = _kivy_game(rng)
+    game.start()
+
+    def play(turns):
+        most = 0
+        for _ in range(turns):
+            _play_turn(game)
+            most = max(most, _drawn_widgets(game))
+        return {
+            'children': most,
+            'widgets_built': len(game.pool),
+            'rss_kb': _rss_kb(),
+        }
+
+    before = play(warmup)
+    after = play(turns)
+    return {'turns': turns, 'before': before, 'after': after}
+
+
+def run(seed=0, kivy=True):
+    results = {}
+    results.update(bench_resolver(random.Random(seed)))
+    results.update(bench_simulation(random.Random(seed)))
+    results.update(bench_scenarios())
+    if kivy:
+        results.update(bench_kivy(random.Random(seed)))
+
+    return {
+        'time': time(),
+        'seed': seed,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(old, new):
+    """
+    Print the rates side by side
+
+    >>> compare({'results': {'must_yield': 100.0}},
+    ...         {'results': {'must_yield': 50.0, 'frame_update': 40.0}})
+    must_yield                100 ->       50   0.50x
+    frame_update                - ->       40
+    """
+
+    for name, rate in new['results'].items():
+        if name in old['results']:
+            before = old['results'][name]
+            print(f'{name:20} {before:8.0f} -> {rate:8.0f} {rate/before:6.2f}x')
+        else:
+            print(f'{name:20} {"-":>8} -> {rate:8.0f}')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description='Time the hot spots of the game'
+    )
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--soak', type=int, metavar='TURNS',
+        help='instead of timing, check that this many turns leak no widgets'
+    )
+    parser.add_argument(
+        '--rss-limit', type=int, default=2048, metavar='KIB',
+        help='with --soak, how much resident memory may grow after warming up'
+    )
+    parser.add_argument(
+        '--no-kivy', action='store_true',
+        help='skip the benchmarks needing a (possibly offscreen) window'
+    )
+    args = parser.parse_args(argv)
+
+    if args.soak:
+        result = soak(random.Random(args.seed), turns=args.soak)
+        print(json.dumps(result, indent=2))
+        before, after = result['before'], result['after']
+        if (after['children'] > before['children'] or
+                after['widgets_built'] > before['widgets_built']):
+            sys.exit('Widgets pile up from turn to turn!')
+        if before['rss_kb'] is None:
+            print('Resident memory is not known here; not checked.')
+        elif after['rss_kb'] - before['rss_kb'] > args.rss_limit:
+            sys.exit(f'Memory grew by {after["rss_kb"] - before["rss_kb"]} '
+                     f'KiB, more than {args.rss_limit} KiB!')
+        return
+
+    report = run(seed=args.seed, kivy=not args.no_kivy)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    else:
+        for name, rate in report['results'].items():
+            print(f'{name:20} {rate:10.0f} /s')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -12,7 +12,7 @@ package.domain = ro.go.danuker
 source.dir = .
 
 # (list) Source files to include (let empty to include all the files)
-source.include_exts = py,png,jpg,kv,atlas,ogg,txt
+source.include_exts = py,png,jpg,kv,atlas,json,ogg,txt,bank
 
 # (list) List of inclusions using pattern matching
 #source.include_patterns = assets/*,images/*.png
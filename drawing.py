@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# What an intersection looks like: which sprites, where, and how large.
+# Coordinates are in pixels, from the bottom-left corner (like Kivy's).
+# Does not need Kivy, so that tools can draw intersections too.
+
+# Colors, as RGB from 0 to 1
+background_color = (.5, .5, .5)
+road_color = (.25, .25, .25)
+
+# Sprites of cars, by turn signal
+car_pictures = {
+    'sig_no': 'car',
+    'sig_left': 'car_signal_left',
+    'sig_right': 'car_signal_right'
+}
+player_pictures = {
+    'sig_no': 'player',
+    'sig_left': 'player_signal_left',
+    'sig_right': 'player_signal_right'
+}
+
+# Rotation of cars coming from each road, in degrees counterclockwise
+car_angles = {
+    'left': -90, 'ahead': 180, 'right': 90, 'behind': 0,
+}
+
+# For every road: which way is away from the center,
+# and which way is the right-hand lane of cars coming from it
+road_axes = {
+    'left': ((-1, 0), (0, -1)),
+    'right': ((1, 0), (0, 1)),
+    'behind': ((0, -1), (1, 0)),
+    'ahead': ((0, 1), (-1, 0)),
+}
+
+
+def lane_width(width):
+    """Lanes are a fifth of the screen wide"""
+    return width * 0.2
+
+
+def place_on_road(road, center_x, center_y, dist_from_center, lane):
+    """
+    Coordinates of a point on a road, dist_from_center away from the center
+    of the intersection, and lane to the right of the road's middle.
+
+    >>> place_on_road('left', 100, 200, 50, 10)
+    [50, 190]
+    >>> place_on_road('ahead', 100, 200, 50, 10)
+    [90, 250]
+    """
+
+    (away_x, away_y), (lane_x, lane_y) = road_axes[road]
+    return [
+        center_x + away_x*dist_from_center + lane_x*lane,
+        center_y + away_y*dist_from_center + lane_y*lane
+    ]
+
+
+def road_rect(road, width, height):
+    """
+    Position and size of a road, as [x, y, w, h]
+
+    >>> road_rect('behind', 500, 1000)
+    [150.0, 0, 200.0, 500.0]
+    """
+
+    lane = lane_width(width)
+    return {
+        'left': [0, height/2 - lane, width/2 + lane, lane*2],
+        'ahead': [width/2 - lane, height/2, lane*2, height - height/2],
+        'right': [width/2 - lane, height/2 - lane, width/2 + lane, lane*2],
+        'behind': [width/2 - lane, 0, lane*2, height/2],
+    }[road]
+
+
+def car_center(source_road, width, height, seconds):
+    """
+        Where a car is, `seconds` after the turn started: cars drive up to
+    the intersection from the edges of the screen, in their right-hand lane.
+
+    >>> car_center('behind', 500, 1000, 0)
+    [300.0, 250.0]
+    """
+
+    speed = min(width, height)/100
+    dist_from_center = width/2 - seconds*speed
+    return place_on_road(
+        source_road, width/2, height/2, dist_from_center, lane_width(width)/2
+    )
+
+
+def signs(control_type, prios):
+    """
+        The signs of an intersection, as (name, facing, with_panel),
+    in the order they are drawn.
+
+        prios : right-of-way by road, in the order of the scenario
+
+    >>> signs('yield-sign-only',
+    ...       {'behind': False, 'left': True, 'right': True})
+    [('yield', 'behind', False)]
+    """
+
+    if control_type == 'uncontrolled':
+        return []
+
+    # The player's sign is drawn last
+    roads = [road for road in prios if road != 'behind'] + ['behind']
+
+    found = []
+    for road in roads:
+        if control_type == 'controlled':
+            found.append(('prio' if prios[road] else 'yield', road, True))
+        elif not prios[road]:
+            # No minimap panel
+            found.append(('yield', road, False))
+    return found
+
+
+def sign_pictures(name, facing, with_panel, prios):
+    """
+        Sprites of a sign, from the bottom up: the player's sign is behind
+    its pole, and its panel shows the right-of-way of every road.
+
+    >>> sign_pictures('prio', 'left', True, {'behind': False})
+    ['sign-prio-ahead-left', 'panel-ahead-left', 'pole']
+    >>> sign_pictures('yield', 'behind', True, {'behind': False, 'left': True})
+    ['pole', 'sign-yield-behind', 'panel-blank', 'panel-yieldbehind', 'panel-prioleft']
+    """
+
+    if facing == 'behind':
+        panels = ['panel-blank'] + [
+            f'panel-{"prio" if has_prio else "yield"}{road}'
+            for road, has_prio in prios.items()
+        ]
+        sign = f'sign-{name}-behind'
+    else:
+        if facing in ['left', 'right']:
+            facing = f'ahead-{facing}'
+        panels = [f'panel-{facing}']
+        sign = f'sign-{name}-{facing}'
+
+    if not with_panel:
+        panels = []
+
+    if facing == 'behind':
+        return ['pole', sign] + panels
+    return [sign] + panels + ['pole']
+
+
+def sign_center(facing, width, height):
+    """Where a sign stands: by the road's right-hand side, near the center"""
+    lane = lane_width(width)
+    return place_on_road(facing, width/2, height/2, lane*1.5, lane*1.5)
+
+
+def sign_size(width):
+    """Signs (and their panels and poles) are 4 lanes wide, and as tall"""
+    return lane_width(width) * 4
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Every answer ever given, in a file which only grows: a header, then one
+# fixed-size record per answer. Statistics read the file through mmap, one
+# column at a time, so even years of play do not become Python objects.
+# Does not need Kivy.
+#
+# Usage: python history.py answers.log
+
+from collections import Counter
+import mmap
+import os
+import struct
+import sys
+from time import time
+
+from training import rules
+
+HEADER = b'YODLOG\x01\x00'
+
+# Seconds since 1970, scenario id, outcome (see `outcome`),
+# a spare byte, reaction time in ms, and 2 spare bytes
+RECORD = struct.Struct('<IHBxHxx')
+
+# Where the columns are, in a record
+OUTCOME_OFFSET = 6
+REACTION_OFFSET = 8
+
+
+def outcome(rule, move, correct):
+    """
+    Rule, move and correctness packed in one byte, so counting byte values
+    counts all three together
+
+    >>> outcome(4, 'stop', True)
+    19
+    """
+    return rule << 2 | (move == 'stop') << 1 | bool(correct)
+
+
+class AnswerLog:
+    """
+        Appends answers to a log file, a batch at a time
+    (call `flush` before the app closes or pauses).
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'answers.log')
+    >>> log = AnswerLog(path, batch=2)
+    >>> log.append(10, rule=4, move='stop', correct=True, reaction=1.5)
+    >>> os.path.exists(path)
+    False
+    >>> log.append(11, rule=5, move='go', correct=False, reaction=0.8)
+    >>> os.path.getsize(path) == len(HEADER) + 2 * RECORD.size
+    True
+
+    Answers after a torn record still line up:
+
+    >>> with open(path, 'ab') as f:
+    ...     _ = f.write(b'torn!')
+    >>> log.append(12, rule=2, move='go', correct=True, reaction=0.5)
+    >>> log.append(13, rule=2, move='go', correct=True, reaction=0.5)
+    >>> stats(path)['rules']
+    {2: (2, 2), 4: (1, 1), 5: (0, 1)}
+
+    >>> with open(path, 'wb') as f:
+    ...     _ = f.write(b'Something else entirely')
+    >>> log.append(14, rule=2, move='go', correct=True, reaction=0.5)
+    >>> log.flush()  # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    ValueError: ... is not an answer log!
+    """
+
+    def __init__(self, path, batch=16):
+        self.path = path
+        self.batch = batch
+        self._pending = []
+
+    def append(self, scenario_id, rule, move, correct, reaction):
+        """reaction : seconds from the turn's start to the move"""
+        self._pending.append(RECORD.pack(
+            int(time()), scenario_id, outcome(rule, move, correct),
+            min(int(reaction * 1000), 0xffff)
+        ))
+        if len(self._pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        # Appending mode, so every write still goes to the end of the file
+        with open(self.path, 'a+b') as f:
+            f.seek(0)
+            header = f.read(len(HEADER))
+            if header != HEADER:
+                if not HEADER.startswith(header):
+                    raise ValueError(f'{self.path} is not an answer log!')
+                # New, or cut short while writing the header
+                f.truncate(0)
+                f.write(HEADER)
+            else:
+                # Drop a record cut short by a crash, which would shift
+                # every record after it
+                size = f.seek(0, os.SEEK_END)
+                f.truncate(size - (size - len(HEADER)) % RECORD.size)
+            f.write(b''.join(self._pending))
+        self._pending = []
+
+
+def histogram_percentile(counts, p):
+    """
+    Nearest-rank percentile, from how many times each value occurs
+
+    >>> histogram_percentile({300: 1, 500: 2, 900: 1}, 50)
+    500
+    >>> histogram_percentile({300: 1, 500: 2, 900: 1}, 99)
+    900
+    """
+    total = sum(counts.values())
+    rank = max(0, min(total - 1, round(p / 100 * total) - 1))
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen > rank:
+            return value
+
+
+def stats(path):
+    """
+        Accuracy per rule, streaks of right answers, and reaction time
+    percentiles (in ms), from a log file.
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'answers.log')
+    >>> log = AnswerLog(path)
+    >>> for correct in [True, True, False, True]:
+    ...     log.append(0, rule=4, move='go', correct=correct, reaction=0.5)
+    >>> log.flush()
+    >>> result = stats(path)
+    >>> result['answers'], result['rules'][4], result['best_streak']
+    (4, (3, 4), 2)
+    >>> result['current_streak'], result['reaction_ms']
+    (1, {50: 500, 95: 500, 99: 500})
+    """
+
+    result = {
+        'answers': 0, 'rules': {}, 'best_streak': 0, 'current_streak': 0,
+        'reaction_ms': {},
+    }
+
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return result
+
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        # A record cut short by a crash is ignored
+        count = (size - len(HEADER)) // RECORD.size
+        if count <= 0:
+            return result
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(HEADER)] != HEADER:
+                raise ValueError(f'{path} is not an answer log!')
+
+            with memoryview(data) as whole:
+                records = whole[len(HEADER):len(HEADER) + count*RECORD.size]
+                # One column at a time, copied out in C
+                outcomes = bytes(records[OUTCOME_OFFSET::RECORD.size])
+                # Reaction times are whole milliseconds: counting each one
+                # is enough for percentiles, without sorting them all
+                with records.cast('H') as shorts:
+                    reactions = Counter(
+                        shorts[REACTION_OFFSET // 2::RECORD.size // 2]
+                    )
+                records.release()
+
+    result['answers'] = count
+    for rule in rules:
+        right = sum(outcomes.count(outcome(rule, move, True))
+                    for move in ('go', 'stop'))
+        wrong = sum(outcomes.count(outcome(rule, move, False))
+                    for move in ('go', 'stop'))
+        if right or wrong:
+            result['rules'][rule] = (right, right + wrong)
+
+    # One byte per answer: 1 if right, 0 if wrong
+    correct = outcomes.translate(bytes(i & 1 for i in range(256)))
+    result['best_streak'] = max(map(len, correct.split(b'\0')))
+    result['current_streak'] = len(correct) - correct.rfind(b'\0') - 1
+
+    result['reaction_ms'] = {
+        p: histogram_percentile(reactions, p) for p in (50, 95, 99)
+    }
+    return result
+
+
+def report(result):
+    lines = [f'Answers: {result["answers"]}']
+    for rule, (right, total) in sorted(result['rules'].items()):
+        lines.append(f'  {rules[rule]}: {right}/{total} right '
+                     f'({right / total:.0%})')
+    lines.append(f'Best streak: {result["best_streak"]}, '
+                 f'current: {result["current_streak"]}')
+    if result['reaction_ms']:
+        lines.append('Reaction time: ' + ', '.join(
+            f'p{p} {ms} ms' for p, ms in result['reaction_ms'].items()
+        ))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    print(report(stats(sys.argv[1])))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from kivy.graphics import Fbo, ClearColor, ClearBuffers, Color, Rectangle
+from kivy.uix.widget import Widget
+
+from model import StretchyImage
+
+
+class StaticLayer(Widget):
+    """
+        Widgets and drawings which stay still for a whole turn (roads,
+    signs), rendered once into an offscreen framebuffer, and then drawn
+    every frame as a single rectangle.
+
+        Show pictures with `sprite`, and draw under them on
+    `scene.canvas.before`; then call `redraw`, which must also be called when
+    the screen changes size. Both sprites and drawings are kept from turn to
+    turn (`clear` only hides the sprites), since adding and removing widgets
+    of a scene drawn offscreen makes memory grow turn after turn.
+    """
+
+    def __init__(self, **kwargs):
+        Widget.__init__(self, **kwargs)
+        self.scene = Widget()
+        self.fbo = None  # Made on the first redraw, once OpenGL is ready
+        self.sprites = []  # Bottom to top
+        self.shown = 0  # How many sprites are in use this turn
+
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.rect = Rectangle(size=(0, 0))
+
+    def sprite(self, texture):
+        """A sprite showing `texture`, above those handed out before it"""
+        if self.shown == len(self.sprites):
+            self.sprites.append(StretchyImage())
+            self.scene.add_widget(self.sprites[-1])
+
+        image = self.sprites[self.shown]
+        image.texture = texture
+        self.shown += 1
+        return image
+
+    def clear(self):
+        """Hide the sprites (not the drawings), for a new turn"""
+        for image in self.sprites[:self.shown]:
+            image.size = [0, 0]
+        self.shown = 0
+
+    def redraw(self, size):
+        """Render the scene, with the screen being `size` pixels large"""
+        size = tuple(int(x) for x in size)
+
+        if self.fbo is None:
+            self.fbo = Fbo(size=size)
+            with self.fbo:
+                ClearColor(0, 0, 0, 0)
+                ClearBuffers()
+            self.fbo.add(self.scene.canvas)
+        elif self.fbo.size != size:
+            self.fbo.size = size
+
+        self.fbo.draw()
+        self.rect.texture = self.fbo.texture
+        self.rect.size = size
@@ -26,33 +26,46 @@ from kivy.uix.label import Label
 from kivy.properties import NumericProperty
 from kivy.graphics import Color, Rectangle
 from kivy.config import Config
+from kivy.logger import Logger
 
-import random
 from time import time
-from model import PlayerCar, Car, Sign, Audio
+import os
+import random
+from model import PlayerCar, Car, Sign, Audio, WidgetPool
+import scenario_bank
+from simulation import Simulation
+from textures import TextureRegistry, CachedLabel, render_text
+from scheduler import FrameScheduler
+from startup import PhaseTimer, AssetLoader
+from profiler import FrameProfiler
+from layers import StaticLayer
+from swipe import Swipe, HINT, SHOW, NEXT
+from drawing import (
+    lane_width, road_axes, road_color, road_rect, sign_size, signs
+)
+from replay import Recording, new_seed
+from training import Trainer
+from history import AnswerLog, report, stats
 from math import ceil
 
 
-def choice(collection):
-    """Like random.choice, but works on sets"""
-    return random.choice(list(collection))
-
-
 class Intersection:
-    def __init__(self, app, game):
+    """Draws a simulation.Turn, and passes the player's move to it"""
+    def __init__(self, app, game, turn):
         self.app = app
         self.game = game
+        self.turn = turn
 
         self.roads = []  # Roads of NPCs
+        self.player = None
         self.other_cars = []
+        self.signs = []
         self.type = 'controlled'
-        self.time = time()
-        self.touch_start_y = False
-        self.player_move = None
-        self.last_frame_touch_y = None  # Used for animating car while choosing direction
-        self.player_seen_output = False
-        self.label = Label(text='', outline_color = [0,0,0,.7])
-        self.correct = None # Player moved correctly
+        self.time = game.clock()
+        self.swipe = Swipe(threshold=self.app.lane_width/2)
+        self.label = game.label
+        self.label.text = ''
+        self.label.color = [1, 1, 1, 1]
 
     @property
     def width(self):
@@ -66,48 +79,50 @@ class Intersection:
         self.init_roads()
         self.init_cars()
         self.init_signs()
+        self.layout()
+
+    @property
+    def player_move(self):
+        return self.swipe.decision
+
+    @property
+    def reaction_time(self):
+        """Seconds from the start of the turn to the player's move"""
+        if self.swipe.decided_at is None:
+            return None
+        return self.swipe.decided_at - self.time
 
     def on_touch_down(self, touch):
-        if not self.touch_start_y:
-            self.touch_start_y = touch.y
-            self.last_frame_touch_y = touch.y
+        self.swipe.down(touch.uid, touch.y)
 
     def on_touch_up(self, touch):
-        if touch.y < self.height* 0.8:
-            # User is not trying to access the status bar
-
-            if self.touch_start_y and not self.player_move:
-                # Short move finalized
-                self.label.text = 'You are the red car.\nSwipe up to go, or down to stop!'
-                self.label.color = [1, 1, 0, 1]
-                self.touch_start_y = None
-
-            elif self.player_move and self.player_seen_output:
-                # Second time we touch down: we want a new scene
-                if self.correct is None:
-                    raise ValueError('Correct is None')
-                self.game.next_turn(self.correct)
-            else:
-                # Long move just finalized
-                self.player_seen_output = True
+        # Lifting over the status bar is ignored (the user may be opening it)
+        action = self.swipe.up(
+            touch.uid, ignored=touch.y >= self.height * 0.8
+        )
+        if action == HINT:
+            self.label.text = 'You are the red car.\nSwipe up to go, or down to stop!'
+            self.label.color = [1, 1, 0, 1]
+        elif action == SHOW:
+            # While the player reads the result, get the next turn ready
+            Clock.schedule_once(self.game.prepare_next_turn)
+        elif action == NEXT:
+            self.game.next_turn()
 
     def on_touch_move(self, touch):
-        if self.touch_start_y and not self.player_move:
-            self.player.center_y += touch.y-self.last_frame_touch_y
-            self.last_frame_touch_y = touch.y
-
-        if touch.y - self.app.lane_width/2 > self.touch_start_y:
-            self.player_move = 'go'
-            self.moved()
-        elif touch.y + self.app.lane_width/2 < self.touch_start_y:
-            self.player_move = 'stop'
-            self.moved()
+        # The car follows the finger on the next frame (see `update`);
+        # only the event deciding the move is handled right away
+        if self.swipe.move(touch.uid, touch.y, self.game.clock()):
+            # Latency of the sound is counted from when the touch moved
+            self.moved(touch.time_update)
 
-    def moved(self):
-        correct = ((self.player_move == 'stop') == (self.player.must_yield))
+    def moved(self, event_time=None):
+        """The player's move was decided; called once per turn"""
+        correct = self.turn.decide(self.player_move)
+        self.game.answered(self.turn)
 
         # If you want an example of violating the Law of Demeter, here it is:
-        self.app.audio.play(self.player_move == 'go', correct)
+        self.app.audio.play(self.player_move == 'go', correct, event_time)
 
         if correct:
             self.label.color = [.3, 1, .3, 1]
@@ -115,18 +130,49 @@ class Intersection:
             self.label.text = f'Correct!\nYou {action}.\nScore so far: {self.game.score+1}'
         else:
             self.label.color = [1, .3, .3, 1]
-            self.label.text = f'You lost!\n{self.player.reason}\nScore: {self.game.score}'
-
-        self.correct = correct
+            self.label.text = f'You lost!\n{self.turn.reason}\nScore: {self.game.score}'
+
+    def layout(self):
+        """Place what only moves when the screen changes size"""
+        profiler = self.app.profiler
+        self.app.lane_width = lane_width(self.width)
+        self.swipe.threshold = self.app.lane_width/2
+        with profiler.section('update_roads'):
+            self.update_roads()
+        with profiler.section('update_signs'):
+            self.update_signs()
+        with profiler.section('update_label'):
+            self.update_label()
+
+        if self.player is not None:
+            with profiler.section('static'):
+                self.game.static.redraw(self.game.size)
 
     def update(self, _):
-        self.app.lane_width = self.width * 0.2
-        if not self.touch_start_y:
+        """Move the cars; called every frame"""
+        if not self.swipe.started:
             self.player.center_x = self.width/2 + self.app.lane_width/2
-        self.update_cars()
-        self.update_roads()
-        self.update_signs()
-        self.update_label()
+        self.player.center_y += self.swipe.drag()
+        with self.app.profiler.section('update_cars'):
+            self.update_cars()
+
+    def animating(self):
+        """Whether cars are still driving up to the intersection"""
+        if self.player is None:
+            return False
+
+        return any(
+            car.stop_time == float('inf')
+            for car in [self.player] + self.other_cars
+        )
+
+    def blink(self, state):
+        """Turn signal lights on or off, unless the player is deciding"""
+        if self.player is None or self.swipe.started:
+            return
+
+        for car in [self.player] + self.other_cars:
+            car.blink(state)
 
     def update_cars(self):
         self.player.update()
@@ -134,44 +180,10 @@ class Intersection:
             car.update()
 
     def update_roads(self):
-        road_coords ={
-            'left': {
-                'x': 0,
-                'y': self.height / 2 - self.app.lane_width,
-                'w': self.width/2 + self.app.lane_width,
-                'h': self.app.lane_width * 2
-            },
-            'ahead': {
-                'x': self.width/2 - self.app.lane_width,
-                'y': self.height / 2,
-                'w': self.app.lane_width * 2,
-                'h': self.height - self.height / 2,
-            },
-            'right': {
-                'x': self.width/2 - self.app.lane_width,
-                'y': self.height / 2 - self.app.lane_width,
-                'w': self.width/2 + self.app.lane_width,
-                'h': self.app.lane_width * 2
-            },
-            'behind': {
-                'x': self.width/2 - self.app.lane_width,
-                'y': 0,
-                'w': self.app.lane_width * 2,
-                'h': self.height / 2,
-            },
-        }
-
         for rn in self.roads:
-            road = self.roads[rn]
-            road.pos = [
-                road_coords[rn]['x'],
-                road_coords[rn]['y'],
-            ]
-            road.size = [
-                road_coords[rn]['w'],
-                road_coords[rn]['h'],
-
-            ]
+            x, y, w, h = road_rect(rn, self.width, self.height)
+            self.roads[rn].pos = [x, y]
+            self.roads[rn].size = [w, h]
 
     def update_signs(self):
         for sign in self.signs:
@@ -185,137 +197,363 @@ class Intersection:
         self.label.outline_width = ceil(self.width * 0.005)
 
     def init_roads(self):
-        num_roads = random.choice([3, 4])
-
-        road_names = ['left', 'ahead', 'right']
-        if num_roads != 4:
-            assert num_roads == 3
-            del road_names[random.choice([0, 1, 2])]
-
-        # We want yield-only and controlled intersections more often
-        self.type = random.choices(
-            ['uncontrolled', 'yield-sign-only', 'controlled'],
-            weights=[1, 2, 3]
-        )[0]
+        self.type = self.turn.type
+        self.prios = self.turn.prios
 
+        # The game's road rectangles; roads not in this turn are hidden
         self.roads = {}
-        with self.game.canvas:
-            Color(.25, .25, .25)
-            for rn in road_names:
-                self.roads[rn] = Rectangle()
-
-            # Mandatory road where player comes from
-            self.roads['behind'] = Rectangle()
-
-        self._generate_road_prios()
-
-    def _generate_road_prios(self):
-        self.prios = {road: False for road in self.roads}
-
-        if self.type == 'uncontrolled':
-            chosen_prios = []
-        elif self.type == 'yield-sign-only':
-            # We can only choose between opposite roads to have priority
-            opposites = [{'behind', 'ahead'}, {'left', 'right'}]
-            possible_prio_pair = []
-            for pair in opposites:
-                if len(pair.intersection(self.roads.keys())) == 2:
-                    # Both roads in pair exist
-                    possible_prio_pair.append(pair)
-            chosen_prios = random.choice(possible_prio_pair)
-        elif self.type == 'controlled':
-            chosen_prios = random.sample(self.roads.keys(), 2)
-
-        for road in chosen_prios:
-            self.prios[road] = True
+        for rn, rect in self.game.roads.items():
+            if rn in self.prios:
+                self.roads[rn] = rect
+            else:
+                rect.size = [0, 0]
 
     def init_cars(self):
+        targets = self.turn.targets
+
         # Player
-        self.player = PlayerCar(
+        self.player = self.game.pool.car(
+            PlayerCar,
             source_road='behind',
-            target_road=choice(set(self.roads.keys()) - {'behind'}),
-            app=self.app
+            target_road=targets['behind']
         )
-        self.game.add_widget(self.player)
+        self.game.cars.add_widget(self.player)
 
         # Other cars
         self.other_cars = []
-        for road_n in set(self.roads) - {'behind'}:
-            if random.random() < 2:
-                target_road = choice(set(self.roads.keys()) - {road_n})
+        for road_n in targets:
+            if road_n != 'behind':
                 self.other_cars.append(
-                    Car(
+                    self.game.pool.car(
+                        Car,
                         source_road=road_n,
-                        target_road=target_road,
-                        app=self.app
+                        target_road=targets[road_n]
                     )
                 )
+
         for car in self.other_cars:
-            self.game.add_widget(car)
+            self.game.cars.add_widget(car)
 
         for car in [self.player] + self.other_cars:
-            car.must_yield, car.reason = \
-                car.must_yield(self.other_cars, self.prios)
+            car.must_yield, car.reason = self.turn.verdicts[car.source_road]
 
     def init_signs(self):
-        self.signs = []
-        if self.type != 'uncontrolled':
-            for road in self.roads:
-                if self.type == 'controlled' and self.prios[road]:
-                    self.signs.append(Sign(self.app, 'prio', road, True))
-                elif self.type == 'controlled' and not self.prios[road]:
-                    self.signs.append(Sign(self.app, 'yield', road, True))
-                elif not self.prios[road]:
-                    # No minimap panel
-                    self.signs.append(Sign(self.app, 'yield', road, False))
-
-        self.game.add_widget(self.label)
+        self.signs = [
+            Sign(self.app, name, facing, with_panel)
+            for name, facing, with_panel in signs(self.type, self.prios)
+        ]
 
 
 class YieldOrDieGame(Widget):
-    """Remember score and rebuild intersection each turn"""
-    def __init__(self, app):
+    """Draw the simulation, and rebuild intersection each turn"""
+
+    # Most cars a turn can need (sign sprites are kept by the static layer)
+    turn_widgets = {PlayerCar: 1, Car: 3}
+
+    def __init__(self, app, seed=None, clock=time):
+        """
+        seed : deals the same intersections every time; random if None
+        clock : function giving the time which moves the cars
+        """
         Widget.__init__(self)
-        self.score = 0
         self.app = app
-        self.intersection = Intersection(self.app, self)
+        self.seed = new_seed() if seed is None else seed
+        self.recording = Recording(self.seed)
+        self.clock = clock
+        self.pool = WidgetPool(self.app)
+        self.label = CachedLabel(outline_color=[0, 0, 0, .7])
+
+        # Drawn bottom to top: roads and signs, cars, and the text
+        self.static = StaticLayer()
+        self.cars = Widget()
+
+        # Drawn once, and reused every turn (see Intersection.init_roads);
+        # before the signs, which are widgets of the same scene
+        with self.static.scene.canvas.before:
+            Color(*road_color)
+            self.roads = {road: Rectangle(size=[0, 0]) for road in road_axes}
+        for layer in [self.static, self.cars, self.label]:
+            self.add_widget(layer)
+
+        self.touches = 0  # Fingers on the screen
+        self.blink_state = True
+        self.frames = FrameScheduler(self.update, self.animating)
+        self.simulation = Simulation(
+            self.app.scenarios, rng=random.Random(self.seed),
+            trainer=Trainer(self.app.scenarios)
+        )
+        self.intersection = \
+            Intersection(self.app, self, self.simulation.turn)
+
+    @property
+    def score(self):
+        return self.simulation.score
 
     def start(self):
         self.intersection.start()
 
+    def on_size(self, *_):
+        # Texts rendered for the old size will not be shown again
+        render_text.cache_clear()
+        # Signs take the new textures when laid out, cars when they blink
+        self.app.textures.fit(sign_size(self.width))
+        self.intersection.layout()
+        self.frames.wake()
+
+    def animating(self):
+        """Whether frames are needed: moving cars, or a finger moving one"""
+        return self.touches > 0 or self.intersection.animating()
+
+    def blink(self, _):
+        self.blink_state = not self.blink_state
+        self.intersection.blink(self.blink_state)
+
     def on_touch_down(self, touch):
+        self.touches += 1
+        if self.touches == 3:
+            # Three fingers show or hide the performance overlay
+            self.app.toggle_overlay()
+        elif self.touches == 4:
+            # Four fingers show or hide the statistics of all answers
+            self.app.toggle_history()
+        self.frames.wake()
         self.intersection.on_touch_down(touch)
     def on_touch_up(self, touch):
+        self.touches = max(0, self.touches - 1)
         self.intersection.on_touch_up(touch)
+        self.frames.wake()
     def on_touch_move(self, touch):
         self.intersection.on_touch_move(touch)
 
-    def next_turn(self, won):
-        if won:
-            self.score += 1
-        else:
-            self.score = 0
-        self.canvas.clear()
-        self.intersection = Intersection(self.app, self)
+    def prepare_next_turn(self, _=None):
+        """
+            Deal the next turn now, and build the widgets it may need
+        on the following frame, so that `next_turn` is only a swap.
+        """
+        with self.app.profiler.section('prepare'):
+            self.simulation.prepare()
+        Clock.schedule_once(self._stock_widgets)
+
+    def _stock_widgets(self, _):
+        with self.app.profiler.section('prepare'):
+            for cls, count in self.turn_widgets.items():
+                self.pool.stock(cls, count)
+
+    def next_turn(self):
+        with self.app.profiler.section('next_turn'):
+            self._next_turn()
+        self.frames.wake()
+
+    def answered(self, turn):
+        """
+            Keep the player's move as soon as it is decided, so that the turn
+        is kept even if the game is quit before the next one
+        """
+        self.recording.record(turn, turn.player_move)
+        if self.app.answers:
+            self.app.answers.append(
+                turn.scenario_id,
+                rule=self.simulation.trainer.rule_of[turn.scenario_id],
+                move=turn.player_move, correct=turn.correct,
+                reaction=self.intersection.reaction_time or 0
+            )
+
+    def _next_turn(self):
+        turn = self.simulation.next_turn()
+
+        # Give this turn's widgets back, to be reused for the next one
+        self.static.clear()
+        self.cars.clear_widgets()
+        self.pool.release()
+
+        self.intersection = Intersection(self.app, self, turn)
         self.start()
         self.intersection.update(0)
 
     def update(self, seconds_since_last_update):
-        self.intersection.update(seconds_since_last_update)
+        with self.app.profiler.section('frame'):
+            self.intersection.update(seconds_since_last_update)
+
+
+class PerfOverlay(Label):
+    """Frame time percentiles, drawn over the game"""
+    def __init__(self, profiler, **kwargs):
+        Label.__init__(
+            self, font_size='11sp', halign='left', valign='top',
+            font_name='RobotoMono-Regular', color=[1, 1, 0, 1],
+            outline_width=1, outline_color=[0, 0, 0, 1], **kwargs
+        )
+        self.profiler = profiler
+        self.event = None
+
+    def show(self, window):
+        window.add_widget(self)
+        self.size = window.size
+        self.text_size = window.size
+        self.event = Clock.schedule_interval(self.refresh, 0.5)
+        self.refresh()
+
+    def hide(self):
+        self.event.cancel()
+        self.event = None
+        self.parent.remove_widget(self)
+
+    def refresh(self, *_):
+        self.text = self.profiler.report()
+
+
+class HistoryOverlay(Label):
+    """Statistics of every answer so far, drawn over the game"""
+    def __init__(self, text, **kwargs):
+        Label.__init__(
+            self, text=text, font_size='14sp', halign='left', valign='top',
+            color=[1, 1, 1, 1], outline_width=1, outline_color=[0, 0, 0, 1],
+            **kwargs
+        )
+
+    def show(self, window):
+        window.add_widget(self)
+        self.size = window.size
+        self.text_size = window.size
+
+    def hide(self):
+        self.parent.remove_widget(self)
+
 
 class YieldOrDieApp(App):
     lane_width = NumericProperty(1)
     intersection_center_height = 0
 
+    # Timing of frames and turns; set YIELD_OR_DIE_PROFILE=1 to enable
+    profiler = FrameProfiler(
+        enabled=bool(os.environ.get('YIELD_OR_DIE_PROFILE'))
+    )
+    overlay = None
+    history_overlay = None
+    answers = None  # history.AnswerLog, if there is somewhere to keep it
+
     def build(self):
-        self.game = YieldOrDieGame(app=self)
-        self.audio = Audio()
-        Clock.schedule_interval(self.game.update, 1.0/40.0)
+        self.startup = PhaseTimer()
+        self.scenarios, problem = scenario_bank.load()
+        if problem:
+            Logger.warning(f'Scenarios: Resolving them all, since the bank '
+                           f'could not be read: {problem}')
+        self.scenarios.resolve = \
+            self.profiler.wrap('resolver', self.scenarios.resolve)
+        self.startup.mark('scenario index')
+        self.textures = TextureRegistry()
+        seed = os.environ.get('YIELD_OR_DIE_SEED')
+        self.game = YieldOrDieGame(
+            app=self, seed=None if seed is None else int(seed)
+        )
+        Logger.info(f'Game: Seed {self.game.seed}')
+        self.audio = Audio(rng=random.Random(self.game.seed))
+        self.startup.mark('game')
+
+        # Every answer, for statistics: F6 (or four fingers),
+        # or python history.py answers.log
+        try:
+            self.answers = AnswerLog(
+                os.path.join(self.user_data_dir, 'answers.log')
+            )
+        except OSError as e:
+            Logger.warning(f'History: Answers will not be kept: {e}')
+        self.game.frames.wake()
+        # Signal lights of all cars blink together, twice a second
+        Clock.schedule_interval(self.game.blink, 0.5)
 
         return self.game
 
     def on_start(self):
+        # Signs are the largest sprites
+        self.textures.load(sprite_size=sign_size(self.game.width))
+        self.startup.mark('textures')
         self.game.start()
+        self.startup.mark('first turn')
+        Clock.schedule_once(lambda _: self.startup.mark('first frame'))
+
+        # Sounds are not needed before the player swipes
+        AssetLoader([
+            (f'{sound_class} sounds',
+             lambda sound_class=sound_class: self.audio.load(sound_class))
+            for sound_class in self.audio.dirs
+        ]).start()
+
+        self.root_window.bind(on_keyboard=self.on_keyboard)
+
+    def on_keyboard(self, _window, key, *_):
+        if key == 286:  # F5
+            self.toggle_overlay()
+        elif key == 287:  # F6
+            self.toggle_history()
+
+    def toggle_overlay(self):
+        if not self.profiler.enabled:
+            return
+
+        if self.overlay is None:
+            self.overlay = PerfOverlay(self.profiler)
+            self.overlay.show(self.root_window)
+        else:
+            self.overlay.hide()
+            self.overlay = None
+
+    def toggle_history(self):
+        if self.history_overlay is not None:
+            self.history_overlay.hide()
+            self.history_overlay = None
+            return
+        if not self.answers:
+            return
+
+        # Read only when asked for, since the log grows with every answer
+        self.save_answers()
+        try:
+            result = stats(self.answers.path)
+        except (OSError, ValueError) as e:
+            Logger.warning(f'History: Could not read answers: {e}')
+            return
+        self.history_overlay = HistoryOverlay(report(result))
+        self.history_overlay.show(self.root_window)
+
+    def save_answers(self):
+        if self.answers:
+            try:
+                self.answers.flush()
+            except (OSError, ValueError) as e:
+                Logger.warning(f'History: Could not save answers: {e}')
+
+    def on_pause(self):
+        # The app may be killed while paused, without on_stop
+        self.save_answers()
+        return True
+
+    def on_stop(self):
+        Logger.info(
+            f'Frames: {self.game.frames.frames_rendered} rendered, '
+            f'{self.game.frames.frames_skipped} skipped while idle'
+        )
+        Logger.info(f'Audio: Latency {self.audio.latency_report()}')
+        self.save_answers()
+
+        # To see a reported game again: python replay.py last_session.json
+        try:
+            self.game.recording.save(
+                os.path.join(self.user_data_dir, 'last_session.json')
+            )
+        except OSError as e:
+            Logger.warning(f'Game: Could not save the recording: {e}')
+
+        if self.profiler.enabled:
+            try:
+                path = os.path.join(self.user_data_dir, 'frame_times.json')
+                self.profiler.export(
+                    path, window_size=list(self.root_window.size)
+                )
+            except OSError as e:
+                Logger.warning(f'Profiler: Could not write frame times: {e}')
+            else:
+                Logger.info(f'Profiler: Frame times written to {path}')
 
 
 if __name__ == '__main__':
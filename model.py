@@ -20,74 +20,60 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from kivy.uix.widget import Widget
-from kivy.uix.image import Image
-from kivy.properties import NumericProperty, BooleanProperty
+from kivy.graphics import Color, Rectangle
+from kivy.properties import NumericProperty, ObjectProperty
 from kivy.core.audio import SoundLoader
 
-from yield_resolver import must_yield, relative_position
+from yield_resolver import signal_turn
+from drawing import (
+    car_angles, car_center, car_pictures, player_pictures,
+    sign_center, sign_pictures, sign_size
+)
 
-from time import time
+from collections import deque
+from time import perf_counter, time
 import random
 import os
 
 
-class StretchyImage(Image):
-    allow_stretch=BooleanProperty(True)
-
-
-def signal_turn(source_road, target_road):
+class StretchyImage(Widget):
     """
-    Tell the signal
-    >>> signal_turn('left', 'behind')
-    'sig_right'
-    >>> signal_turn('left', 'ahead')
-    'sig_left'
-    >>> signal_turn('left', 'right')
-    'sig_no'
-    >>> signal_turn('right', 'behind')
-    'sig_left'
-    >>> signal_turn('right', 'ahead')
-    'sig_right'
-    >>> signal_turn('behind', 'ahead')
-    'sig_no'
-    >>> signal_turn('ahead', 'left')
-    'sig_right'
-
-    >>> signal_turn('behind', 'behind')
-    Traceback (most recent call last):
-     ...
-    ValueError: U-turns not allowed.
+        A texture stretched over the whole widget (sprites are square).
+    Unlike Kivy's Image, it does not clip with the stencil buffer,
+    which costs three more rectangles per sprite.
     """
+    texture = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
+        Widget.__init__(self, **kwargs)
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.rect = Rectangle(
+                texture=self.texture, pos=self.pos, size=self.size
+            )
+        self.bind(pos=self._place, size=self._place)
 
-    directions = ['behind', 'left', 'ahead', 'right']
-    signals = [None, 'sig_left', 'sig_no', 'sig_right']
-
-    source_i = directions.index(source_road)
-    target_i = directions.index(target_road)
-
-    sig_i = (target_i - source_i) % len(signals)
-    sig = signals[sig_i]
+    def on_texture(self, _, texture):
+        self.rect.texture = texture
 
-    if sig:
-        return sig
-    else:
-        raise ValueError('U-turns not allowed.')
+    def _place(self, *_):
+        self.rect.pos = self.pos
+        self.rect.size = self.size
 
 
 class Car(StretchyImage):
     angle = NumericProperty(0)
-    images = {
-        'sig_no': 'pics/pngs/car.png',
-        'sig_left': 'pics/pngs/car_signal_left.png',
-        'sig_right': 'pics/pngs/car_signal_right.png'
-    }
+    images = car_pictures
 
     def __init__(self, source_road, target_road, app, **kwargs):
         StretchyImage.__init__(self, **kwargs)
 
-        self.source = self.images['sig_no']
-
         self.app = app
+        self.reset(source_road, target_road)
+
+    def reset(self, source_road, target_road):
+        """Get ready for a new turn"""
+        self.texture = self.app.textures[self.images['sig_no']]
         self.intersection = self.app.game.intersection
 
         # Strings that name the road
@@ -95,90 +81,34 @@ class Car(StretchyImage):
         self.target_road = target_road
         self.stop_time = float('inf')
         self.signal = signal_turn(source_road, target_road)
-
-    def must_yield(self, other_cars, prios):
-        for other_car in other_cars:
-            rel = relative_position(
-                self.source_road, other_car.source_road
-            )
-
-            must_yield_now, reason = must_yield(
-                my_right_of_way=prios[self.source_road],
-                my_turn=self.signal,
-                other_right_of_way=prios[other_car.source_road],
-                other_turn=other_car.signal,
-                other_relative_position=rel
-            )
-
-            if must_yield_now:
-                return must_yield_now, reason
-
-        # We don't have to yield to anyone in the intersection
-        return False, \
-            "Other cars either won't cross your path,\nnor need to yield to you."
+        self.angle = car_angles[self.source_road]
 
     def blink(self, state):
         if state:
-            self.source = self.images[self.signal]
+            texture = self.app.textures[self.images[self.signal]]
         else:
-            self.source = self.images['sig_no']
+            texture = self.app.textures[self.images['sig_no']]
+
+        if self.texture is not texture:
+            self.texture = texture
 
     def update(self):
         """Place car on screen"""
-        if self.intersection.touch_start_y:
+        if self.intersection.swipe.started:
             self.blink(True)
             if self.stop_time == float('inf'):
-                self.stop_time = time()
+                self.stop_time = self.intersection.game.clock()
             return
-        else:
-            # Time the blink-lights
-            if int(time() * 2) % 2 == 0:
-                self.blink(True)
-            else:
-                self.blink(False)
-
-        center_x = self.intersection.width / 2
-        center_y = self.intersection.height / 2
-        speed = min(self.intersection.width, self.intersection.height)/100
-        now = min(self.stop_time, time())
-        dist_from_center = center_x - (now - self.intersection.time)*speed
-        lane = self.app.lane_width/2
-
-        car_coords = {
-            'left': [
-                center_x - dist_from_center,
-                center_y - lane
-            ],
-            'right': [
-                center_x + dist_from_center,
-                center_y + lane
-            ],
-            'behind': [
-                center_x + lane,
-                center_y - dist_from_center
-            ],
-            'ahead': [
-                center_x - lane,
-                center_y + dist_from_center
-            ]
-        }
-
-        self.center = car_coords[self.source_road]
 
-        angles = {
-            'left': -90, 'ahead': 180, 'right': 90, 'behind': 0,
-        }
-        self.angle = angles[self.source_road]
+        now = min(self.stop_time, self.intersection.game.clock())
+        self.center = car_center(
+            self.source_road, self.intersection.width,
+            self.intersection.height, now - self.intersection.time
+        )
 
 
 class PlayerCar(Car):
-    def __init__(self, source_road, target_road, app, **kwargs):
-        Car.__init__(self, source_road, target_road, app, **kwargs)
-        self.images = {
-            'sig_no': 'pics/pngs/player.png',
-            'sig_left': 'pics/pngs/player_signal_left.png',
-            'sig_right': 'pics/pngs/player_signal_right.png'
-        }
+    images = player_pictures
 
 
 class Sign(Widget):
@@ -197,81 +127,85 @@ class Sign(Widget):
         self.facing = facing
         self.with_panel = with_panel
 
-        if facing in ['left', 'right']:
-            facing = f"ahead-{facing}"
+        # Signs do not move during a turn
+        self.layer = self.app.game.static
+        self.pic_names = sign_pictures(
+            name, facing, with_panel, self.intersection.prios
+        )
+        self.pics = [self.sprite(pic) for pic in self.pic_names]
+
+    def sprite(self, name):
+        return self.layer.sprite(self.app.textures[name])
 
-        self.sign = StretchyImage(source=f'pics/pngs/sign-{name}-{facing}.png')
-        if self.facing == 'behind':
-            self.panel_pics = self.build_panel_map()
+    def update(self):
+        """Place sign on screen; only needed when the screen changes size"""
+        size = sign_size(self.intersection.width)
+        center = sign_center(
+            self.facing, self.intersection.width, self.intersection.height
+        )
+
+        for pic, name in zip(self.pics, self.pic_names):
+            # The atlas may have changed along with the screen size
+            pic.texture = self.app.textures[name]
+            self._transform_sign_pic(pic, size, center)
+
+    def _transform_sign_pic(self, img, size, center):
+        img.size = [size, size]
+        img.center = center
 
+
+class WidgetPool:
+    """
+        Hands out widgets for one turn, and takes them back for the next,
+    so that a long game does not keep building new ones.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._free = {}  # Widgets not in use, by class
+        self._used = []
+
+    def _take(self, cls):
+        free = self._free.setdefault(cls, [])
+        widget = free.pop() if free else None
+        return widget
+
+    def car(self, cls, source_road, target_road):
+        """A Car (or PlayerCar) going from source_road to target_road"""
+        car = self._take(cls)
+        if car:
+            car.reset(source_road, target_road)
         else:
-            self.panel_pics = [
-                StretchyImage(source=f'pics/pngs/panel-{facing}.png')
-            ]
-        self.pole = StretchyImage(source='pics/pngs/pole.png')
-
-        if facing != 'behind':
-            self.app.game.add_widget(self.sign)
-            self.add_panel_map()
-        self.app.game.add_widget(self.pole)
-        if facing == 'behind':
-            self.app.game.add_widget(self.sign)
-            self.add_panel_map()
-
-    def build_panel_map(self):
-        panels = [
-            StretchyImage(source='pics/pngs/panel-blank.png'),
-        ]
-
-        for road, has_prio in self.intersection.prios.items():
-            kind = 'prio' if has_prio else 'yield'
-
-            panels.append(
-                StretchyImage(source=f'pics/pngs/panel-{kind}{road}.png')
-            )
+            car = cls(source_road, target_road, self.app)
 
-        return panels
+        self._used.append(car)
+        return car
 
-    def add_panel_map(self):
-        if self.with_panel:
-            for pic in self.panel_pics:
-                self.app.game.add_widget(pic)
+    def stock(self, cls, count):
+        """
+            Build widgets ahead of time, until there are `count` of class
+        `cls`, so that handing them out later is only a reset.
+        """
+        built = sum(type(widget) is cls for widget in self._used)
+        free = self._free.setdefault(cls, [])
+        while built + len(free) < count:
+            if issubclass(cls, Car):
+                free.append(cls('behind', 'ahead', self.app))
+            else:
+                free.append(cls())
 
-    def update(self):
-        self._transform_sign_pic(self.pole)
-        self._transform_sign_pic(self.sign)
-        for pic in self.panel_pics:
-            self._transform_sign_pic(pic)
-
-    def _transform_sign_pic(self, img):
-        size = self.app.lane_width * 4
-
-        center_x = self.intersection.width / 2
-        center_y = self.intersection.height / 2
-        dist_from_center = self.app.lane_width*1.5
-        lane = self.app.lane_width*1.5
-
-        positions = {
-            'left': [
-                center_x - dist_from_center,
-                center_y - lane
-            ],
-            'right': [
-                center_x + dist_from_center,
-                center_y + lane
-            ],
-            'behind': [
-                center_x + lane,
-                center_y - dist_from_center
-            ],
-            'ahead': [
-                center_x - lane,
-                center_y + dist_from_center
-            ]
-        }
+    def release(self):
+        """
+        Take back all widgets handed out.
+        They must already be removed from their parent.
+        """
+        for widget in self._used:
+            self._free[type(widget)].append(widget)
+        self._used = []
 
-        img.size = [size, size]
-        img.center = positions[self.facing]
+    def __len__(self):
+        """How many widgets were built so far"""
+        return len(self._used) + sum(len(free) for free in self._free.values())
 
 
 def _oggs_from_dir(directory):
@@ -284,22 +218,108 @@ def _oggs_from_dir(directory):
 
 
 class Audio:
-    def __init__(self):
-        # Load audio in memory (fast playback)
-        self.sounds = self._get_sounds()
+    """
+        Plays the game's sounds on a fixed pool of channels. Every channel
+    has its own copy of every sound, loaded (and decoded) ahead of time,
+    so starting a sound never loads anything, and one copy never plays on
+    two channels. When all channels are busy, the one playing longest is
+    cut off.
+
+    >>> class Sound:
+    ...     def __init__(self): self.state = 'stop'
+    ...     def play(self): self.state = 'play'
+    ...     def stop(self): self.state = 'stop'
+    >>> audio = Audio(rng=random.Random(1))
+    >>> audio.debounce = 0
+    >>> audio.sounds['honk'] = ((Sound(), Sound(), Sound()),)
+    >>> audio.sounds['crash'] = ((Sound(), Sound(), Sound()),)
+    >>> for sound_class in ['honk', 'honk', 'crash', 'crash']:
+    ...     audio.play_sound(sound_class)
+    >>> [sound.state for sound in audio.sounds['honk'][0]]
+    ['stop', 'play', 'stop']
+    >>> [sound.state for sound in audio.sounds['crash'][0]]
+    ['play', 'stop', 'play']
+    """
+
+    # Sound classes, in the order they should be loaded
+    dirs = ('drive', 'crash', 'honk', 'stop')
+
+    # At most this many sounds play at once
+    channels = 3
+
+    # A sound class does not play again sooner than this (in seconds)
+    debounce = 0.5
 
-    def play_sound(self, sound_class):
+    def __init__(self, rng=random):
+        self.rng = rng
+
+        # Per sound class, per sound file: its copy on every channel.
+        # Loaded by `load`, usually in the background; until then, skipped.
+        self.sounds = {}
+
+        # Per channel: (when it started, the sound), or None if never used
+        self.playing = [None] * self.channels
+        self.last_played = {}  # perf_counter() time, by sound class
+        self.latencies = deque(maxlen=100)  # From event to play(), seconds
+
+    def load(self, sound_class):
+        """Load (and decode) all sounds of a class, once per channel"""
+        directory = os.path.join('sounds', sound_class)
+        copies = (
+            tuple(
+                SoundLoader.load(os.path.join(directory, s))
+                for _ in range(self.channels)
+            )
+            for s in _oggs_from_dir(directory)
+        )
+
+        # SoundLoader gives None for sounds it can't play
+        self.sounds[sound_class] = tuple(c for c in copies if all(c))
+
+    def _free_channel(self):
+        """A channel which is not playing, else the one playing longest"""
+        oldest = 0
+        for channel, playing in enumerate(self.playing):
+            if playing is None or playing[1].state != 'play':
+                return channel
+            if playing[0] < self.playing[oldest][0]:
+                oldest = channel
+
+        self.playing[oldest][1].stop()
+        return oldest
+
+    def play_sound(self, sound_class, event_time=None):
         """
-        Play a random sound of the given class
+            Play a random sound of the given class, unless one played
+        very recently.
+
+            event_time : time() of the event causing the sound
+        (i.e. a touch's time_update), to measure latency
         """
+        now = perf_counter()
+        if now - self.last_played.get(sound_class, -self.debounce) \
+                < self.debounce:
+            return
+
         try:
-            sound = random.choice(self.sounds[sound_class])
-            sound.play()
+            copies = self.rng.choice(self.sounds[sound_class])
+        except KeyError:
+            # Not loaded yet: better silent than late
+            return
         except IndexError:
             # We currently don't have any sounds for 'stop', nor a directory
-            pass
+            return
+
+        channel = self._free_channel()
+        sound = copies[channel]
+        sound.play()
+        self.playing[channel] = (now, sound)
+        self.last_played[sound_class] = now
 
-    def play(self, moved: bool, correct: bool):
+        if event_time is not None:
+            self.latencies.append(time() - event_time)
+
+    def play(self, moved: bool, correct: bool, event_time=None):
         """
         Play the appropriate sound, considering whether player
         is moving, and is correct in doing so
@@ -312,18 +332,13 @@ class Audio:
             (False, False): 'honk'
         }
 
-        self.play_sound(sound_class[(moved, correct)])
-
-    def _get_sounds(self):
-        dirs = ('drive', 'crash', 'stop', 'honk')
-
-        choices = {}
-
-        for d in dirs:
-            choices[d] = tuple(
-                SoundLoader.load(os.path.join('sounds', d, s))
-                for s in _oggs_from_dir(os.path.join('sounds', d))
-            )
+        self.play_sound(sound_class[(moved, correct)], event_time)
 
-        return choices
+    def latency_report(self):
+        """Median and worst latency from event to playback, in ms"""
+        if not self.latencies:
+            return 'no sounds played'
 
+        latencies = sorted(self.latencies)
+        median = latencies[len(latencies) // 2]
+        return f'median {median*1000:.1f} ms, worst {latencies[-1]*1000:.1f} ms'
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# In order to have high quality graphics, we work with SVG.
+# However, Kivy does not support it, so we have to convert to PNG.
+#
+# This script rasterizes the SVG files in pics/ into PNGs of several sizes,
+# makes tilted versions of the signs facing ahead, and packs every size
+# into a Kivy atlas. It writes pics/assets.json, which tells the app
+# which atlases there are.
+#
+# Only SVGs whose content changed since the last build, or missing any of
+# their PNGs, are rasterized again.
+#
+# Requires imagemagick (`convert`) or the resvg-py package, Pillow, and Kivy.
+#
+# Usage: python pics/build_assets.py [--force] [--jobs N]
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+PICS = os.path.dirname(os.path.abspath(__file__))
+PNGS = os.path.join(PICS, 'pngs')
+MANIFEST = os.path.join(PICS, 'assets.json')
+
+# Bump when the way PNGs are made changes, to rebuild everything
+VERSION = 2
+
+# Square sizes (in pixels) to rasterize to; the largest goes in pngs/ itself
+SIZES = [128, 256, 512]
+
+# Atlas pages hold this many pixels on a side, at most
+ATLAS_PAGE = 2048
+
+# SVGs which are only kept for reference, and not used in the game
+UNUSED = {'panel-prio-orig.svg', 'panel-yield-orig.svg'}
+
+
+def png_path(name, size):
+    """
+    Where the PNG of a sprite is, for a given size
+
+    >>> os.path.relpath(png_path('car', 512), PICS)
+    'pngs/car.png'
+    >>> os.path.relpath(png_path('car', 128), PICS)
+    'pngs/128/car.png'
+    """
+
+    if size == max(SIZES):
+        return os.path.join(PNGS, f'{name}.png')
+    return os.path.join(PNGS, str(size), f'{name}.png')
+
+
+def atlas_name(size):
+    """
+    >>> atlas_name(512), atlas_name(128)
+    ('sprites', 'sprites-128')
+    """
+
+    if size == max(SIZES):
+        return 'sprites'
+    return f'sprites-{size}'
+
+
+def content_hash(path):
+    digest = hashlib.sha256(f'{VERSION} {SIZES}\n'.encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def skew_coefficients(side, size):
+    """
+        Pillow affine coefficients tilting a sign facing ahead, as seen on
+    the player's right or left (the same as `convert -affine 1,.3,0,1,0,0`,
+    and `1,-.3,0,1,0,0` for the left, cropped back to the original size)
+
+    >>> skew_coefficients('right', 256)
+    (1, 0, 0, -0.3, 1, 38)
+    >>> skew_coefficients('left', 256)
+    (1, 0, 0, 0.3, 1, -38)
+    """
+
+    # The tilt moves the picture by 75px at 512px
+    shift = round(75 * size / 512)
+    if side == 'right':
+        return (1, 0, 0, -0.3, 1, shift)
+    return (1, 0, 0, 0.3, 1, -shift)
+
+
+def outputs(svg):
+    """
+    Names of the sprites made from an SVG
+
+    >>> outputs('sign-yield-ahead.svg')
+    ['sign-yield-ahead', 'sign-yield-ahead-right', 'sign-yield-ahead-left']
+    """
+
+    name = os.path.splitext(os.path.basename(svg))[0]
+    if name.endswith('-ahead'):
+        return [name, f'{name}-right', f'{name}-left']
+    return [name]
+
+
+def render_svg(svg, size, target):
+    if shutil.which('convert'):
+        # -background none: do not fill with white background
+        subprocess.run(
+            ['convert', '-background', 'none', svg,
+             '-resize', f'{size}x{size}', target],
+            check=True
+        )
+        return
+
+    try:
+        import resvg_py
+    except ImportError:
+        sys.exit('Neither imagemagick (convert) nor resvg-py is installed!')
+    with open(target, 'wb') as f:
+        f.write(bytes(resvg_py.svg_to_bytes(svg_path=svg, width=size)))
+
+
+def rasterize(job):
+    """Make the PNG(s) of one SVG at one size; runs in a worker process"""
+    from PIL import Image
+
+    svg, size = job
+    name, *skewed = outputs(svg)
+    target = png_path(name, size)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    render_svg(svg, size, target)
+
+    with Image.open(target) as image:
+        image = image.convert('RGBA')
+        for skewed_name in skewed:
+            side = skewed_name.rsplit('-', 1)[1]
+            image.transform(
+                image.size, Image.AFFINE, skew_coefficients(side, size),
+                resample=Image.BICUBIC
+            ).save(png_path(skewed_name, size))
+
+    return name, size
+
+
+def build_atlases(names):
+    """Pack the PNGs of every size into an atlas (needs Kivy)"""
+
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+    from kivy.atlas import Atlas
+
+    atlases = {}
+    for size in SIZES:
+        pngs = sorted(png_path(name, size) for name in names)
+
+        # As few pages as possible, but not larger than ATLAS_PAGE
+        page = size
+        while page < ATLAS_PAGE and (page // size) ** 2 < len(pngs):
+            page *= 2
+
+        name = atlas_name(size)
+        Atlas.create(os.path.join(PICS, name), pngs, page, padding=0)
+        atlases[str(size)] = f'{name}.atlas'
+
+    return atlases
+
+
+def sprite_names(svgs):
+    """All sprites made from the SVGs, including the tilted signs"""
+
+    return sorted(name for svg in svgs for name in outputs(svg))
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'sources': {}}
+
+
+def build(force=False, jobs=None):
+    manifest = load_manifest()
+    old_hashes = manifest.get('sources', {})
+
+    svgs = sorted(
+        f for f in os.listdir(PICS) if f.endswith('.svg') and f not in UNUSED
+    )
+    hashes = {svg: content_hash(os.path.join(PICS, svg)) for svg in svgs}
+    names = sprite_names(svgs)
+
+    changed = [
+        svg for svg in svgs
+        if force or old_hashes.get(svg) != hashes[svg]
+        or not all(
+            os.path.exists(png_path(name, size))
+            for name in outputs(svg) for size in SIZES
+        )
+    ]
+
+    if changed:
+        print(f'Rasterizing {len(changed)} of {len(svgs)} SVGs ...')
+        work = [(os.path.join(PICS, svg), size)
+                for svg in changed for size in SIZES]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for name, size in pool.map(rasterize, work):
+                print(f'  {name} ({size}px)')
+    else:
+        print('All PNGs are up to date.')
+
+    atlases = manifest.get('atlases', {})
+    if changed or not all(
+        os.path.exists(os.path.join(PICS, atlas))
+        for atlas in atlases.values()
+    ) or set(atlases) != {str(size) for size in SIZES}:
+        print('Packing atlases ...')
+        atlases = build_atlases(names)
+
+    manifest = {
+        'version': VERSION,
+        'sources': hashes,
+        'sprites': names,
+        'atlases': atlases,
+    }
+    with open(MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+    print('Done!')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description='Build PNGs and atlases from the SVGs in pics/'
+    )
+    parser.add_argument(
+        '--force', action='store_true', help='rebuild even unchanged SVGs'
+    )
+    parser.add_argument(
+        '--jobs', type=int, help='worker processes (default: one per CPU)'
+    )
+    args = parser.parse_args(argv)
+
+    build(force=args.force, jobs=args.jobs)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
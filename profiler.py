@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Where does frame time go? Time sections of the code while the game runs.
+# Does not need Kivy.
+
+import json
+import platform
+from collections import deque
+from contextlib import nullcontext
+from time import perf_counter, time
+
+
+def percentile(ordered, p):
+    """
+    Nearest-rank percentile of an already sorted list
+
+    >>> percentile(list(range(1, 101)), 95)
+    95
+    >>> percentile([7], 99)
+    7
+    """
+    rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class _Section:
+    """Adds the time spent inside a `with` block to a profiler"""
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *_):
+        self.samples.append(perf_counter() - self.start)
+
+
+class FrameProfiler:
+    """
+        Keeps the last `window` durations of every named section,
+    so percentiles follow what the game does now, not since startup.
+
+        When not `enabled`, timing costs next to nothing.
+
+    >>> profiler = FrameProfiler(enabled=True)
+    >>> for _ in range(3):
+    ...     with profiler.section('update_cars'):
+    ...         pass
+    >>> sorted(profiler.stats()['update_cars'])
+    ['count', 'max', 'p50', 'p95', 'p99']
+    >>> profiler.stats()['update_cars']['count']
+    3
+    >>> FrameProfiler().section('update_cars')  # doctest: +ELLIPSIS
+    <contextlib.nullcontext object at ...>
+    """
+
+    percentiles = (50, 95, 99)
+
+    def __init__(self, enabled=False, window=500):
+        self.enabled = enabled
+        self.window = window
+        self.samples = {}  # Seconds, by section name
+        self._sections = {}
+        self._disabled = nullcontext()
+
+    def section(self, name):
+        """Context manager timing the code inside it as `name`"""
+        if not self.enabled:
+            return self._disabled
+
+        try:
+            return self._sections[name]
+        except KeyError:
+            samples = self.samples[name] = deque(maxlen=self.window)
+            section = self._sections[name] = _Section(samples)
+            return section
+
+    def wrap(self, name, function):
+        """The function, timed as `name` (or itself when not enabled)"""
+        if not self.enabled:
+            return function
+
+        def timed(*args, **kwargs):
+            with self.section(name):
+                return function(*args, **kwargs)
+        return timed
+
+    def stats(self):
+        """Count, percentiles and worst time of every section, in ms"""
+        stats = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            stats[name] = {'count': len(ordered), 'max': ordered[-1] * 1000}
+            for p in self.percentiles:
+                stats[name][f'p{p}'] = percentile(ordered, p) * 1000
+        return stats
+
+    def report(self):
+        """
+        The stats as a text table
+
+        >>> profiler = FrameProfiler(enabled=True)
+        >>> profiler.samples['frame'] = [0.001, 0.002, 0.010]
+        >>> print(profiler.report())
+        ms              p50    p95    p99    max
+        frame          2.00  10.00  10.00  10.00
+        """
+        lines = [f'{"ms":12} {"p50":>6} {"p95":>6} {"p99":>6} {"max":>6}']
+        for name, s in sorted(self.stats().items()):
+            lines.append(
+                f'{name:12} {s["p50"]:6.2f} {s["p95"]:6.2f} '
+                f'{s["p99"]:6.2f} {s["max"]:6.2f}'
+            )
+        return '\n'.join(lines)
+
+    def export(self, path, **extra):
+        """Write the stats to a JSON file, to compare devices"""
+        with open(path, 'w') as f:
+            json.dump({
+                'time': time(),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'platform': platform.platform(),
+                'window': self.window,
+                'sections': self.stats(),
+                **extra
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Record games, and play them back without graphics, as fast as possible.
+# With the same seed, a game deals the same intersections; the recording
+# also has the player's moves, so a reported wrong verdict can be seen again.
+#
+# Usage: python replay.py last_session.json
+
+import json
+import random
+import sys
+
+from scenarios import ScenarioIndex
+from simulation import Simulation
+from training import Trainer
+
+VERSION = 2  # Since 2, the game deals with a training.Trainer
+
+# Moves take one letter in recordings
+move_codes = {'go': 'g', 'stop': 's'}
+code_moves = {code: move for move, code in move_codes.items()}
+
+
+def new_seed():
+    return random.randrange(2**32)
+
+
+class VirtualClock:
+    """
+        Stands in for time.time, but only moves when told to,
+    so that animations do not depend on how fast frames come.
+
+    >>> clock = VirtualClock()
+    >>> clock.advance(1 / 40)
+    >>> clock()
+    0.025
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class Recording:
+    """
+        The seed of a game, and the scenario and move of every turn.
+
+    >>> recording = Recording(seed=5)
+    >>> simulation = Simulation(rng=random.Random(5))
+    >>> recording.record(simulation.turn, 'go')
+    >>> recording.record(simulation.turn, 'stop')
+    >>> Recording.loads(recording.dumps()).turns == recording.turns
+    True
+    >>> recording.dumps()  # doctest: +ELLIPSIS
+    '{"version": 2, "seed": 5, "scenarios": [..., ...], "moves": "gs"}'
+    """
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.turns = []  # (scenario_id, move) pairs
+
+    def record(self, turn, move):
+        self.turns.append((turn.scenario_id, move))
+
+    def dumps(self):
+        return json.dumps({
+            'version': VERSION,
+            'seed': self.seed,
+            'scenarios': [scenario_id for scenario_id, _ in self.turns],
+            'moves': ''.join(move_codes[move] for _, move in self.turns),
+        })
+
+    @classmethod
+    def loads(cls, text):
+        data = json.loads(text)
+        if data.get('version') != VERSION:
+            raise ValueError(f'Recording version {data.get("version")} '
+                             f'not supported!')
+
+        recording = cls(data['seed'])
+        recording.turns = [
+            (scenario_id, code_moves[code])
+            for scenario_id, code in zip(data['scenarios'], data['moves'])
+        ]
+        return recording
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.loads(f.read())
+
+
+def replay(recording, scenarios=None):
+    """
+        Play a recorded game again, without graphics.
+
+        Returns the turns, decided as recorded. Raises ValueError if the
+    seed does not deal the recorded scenarios (i.e. they changed since).
+
+    >>> recording = Recording(seed=5)
+    >>> scenarios = ScenarioIndex()
+    >>> simulation = Simulation(scenarios, random.Random(5), Trainer(scenarios))
+    >>> for move in ['go', 'stop', 'go']:
+    ...     recording.record(simulation.turn, move)
+    ...     _ = simulation.turn.decide(move)
+    ...     _ = simulation.next_turn()
+    >>> [turn.player_move for turn in replay(recording)]
+    ['go', 'stop', 'go']
+    """
+
+    # Deal like the game does, learning from the recorded answers
+    scenarios = scenarios or ScenarioIndex()
+    simulation = Simulation(
+        scenarios, rng=random.Random(recording.seed),
+        trainer=Trainer(scenarios)
+    )
+
+    turns = []
+    for number, (scenario_id, move) in enumerate(recording.turns):
+        turn = simulation.turn
+        if turn.scenario_id != scenario_id:
+            raise ValueError(
+                f'Turn {number} dealt scenario {turn.scenario_id}, '
+                f'but {scenario_id} was recorded!'
+            )
+        turn.decide(move)
+        turns.append(turn)
+        simulation.next_turn()
+
+    return turns
+
+
+def main(argv):
+    recording = Recording.load(argv[0])
+    for number, turn in enumerate(replay(recording)):
+        verdict = 'right' if turn.correct else 'WRONG'
+        print(f'Turn {number}: scenario {turn.scenario_id} '
+              f'{turn.scenario}, {turn.player_move} ({verdict})')
+        if not turn.correct:
+            print('    ' + turn.reason.replace('\n', '\n    '))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Every scenario, its verdicts and its rule, resolved ahead of time into
+# scenarios.bank, so that the game does not resolve them when starting.
+#
+# The file is a header, the reasons (as UTF-8 text), then one fixed-size
+# record per scenario, in the order of scenarios.enumerate_scenarios.
+# The game maps it into memory, and reads a record only when it is needed.
+#
+# After changing the rules or the scenarios, write it again, and commit it:
+#     python scenario_bank.py
+# To check that it is up to date (i.e. in CI):
+#     python scenario_bank.py --check
+
+import argparse
+from array import array
+import mmap
+import os
+import struct
+import sys
+
+from scenarios import (
+    Scenario, ScenarioIndex, control_types, road_layouts
+)
+
+BANK = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    'scenarios.bank')
+
+MAGIC = b'YODBANK\0'
+VERSION = 2
+
+# Magic, version, number of scenarios, number of reasons
+HEADER = struct.Struct('<8sHHH')
+
+# Length of a reason, in bytes
+REASON = struct.Struct('<H')
+
+# Per scenario: control type, canonical intersection id, the rule deciding
+# the player's verdict (see training.rules), then bit masks (one bit per slot)
+# of roads, right-of-way and cars which must yield, the targets (2 bits per
+# slot), and the reason id of every slot's car
+RECORD = struct.Struct('<BHBBBBB4B')
+
+# Every road has a fixed slot in a record
+slots = road_layouts()[0]
+
+NO_CAR = 0xff
+
+
+def pack(index, scenario_id, reason_ids, rule):
+    """One record of the bank, from a resolved scenario"""
+
+    scenario = index[scenario_id]
+    verdicts = index.resolve(scenario_id)
+    prios = dict(scenario.prios)
+    cars = dict(scenario.cars)
+
+    roads = right_of_way = yields = targets = 0
+    reasons = [NO_CAR] * len(slots)
+    for slot, road in enumerate(slots):
+        if road not in prios:
+            continue
+        roads |= 1 << slot
+        right_of_way |= prios[road] << slot
+        if road in cars:
+            targets |= slots.index(cars[road]) << 2 * slot
+            must_yield, reason = verdicts[road]
+            yields |= must_yield << slot
+            reasons[slot] = reason_ids[reason]
+
+    return RECORD.pack(
+        control_types.index(scenario.control_type),
+        index._intersection_ids[scenario_id], rule,
+        roads, right_of_way, yields, targets, *reasons
+    )
+
+
+def dumps(index):
+    """The bytes of a bank with all scenarios of a ScenarioIndex"""
+
+    reasons = [None] + sorted({
+        reason
+        for scenario_id in range(len(index))
+        for _, reason in index.resolve(scenario_id).values() if reason
+    })
+    reason_ids = {reason: i for i, reason in enumerate(reasons)}
+
+    parts = [HEADER.pack(MAGIC, VERSION, len(index), len(reasons))]
+    for reason in reasons:
+        text = (reason or '').encode('utf-8')
+        parts += [REASON.pack(len(text)), text]
+    parts += [
+        pack(index, scenario_id, reason_ids, rule)
+        for scenario_id, rule in enumerate(index.rules())
+    ]
+    return b''.join(parts)
+
+
+def write(path=BANK, index=None):
+    with open(path, 'wb') as f:
+        f.write(dumps(index or ScenarioIndex()))
+
+
+class ScenarioBank(ScenarioIndex):
+    """
+        A ScenarioIndex read from a bank file, instead of resolved when
+    starting. Deals the same scenarios, with the same ids and verdicts.
+
+        Raises ValueError if the file is not a bank of this version.
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'scenarios.bank')
+    >>> index = ScenarioIndex()
+    >>> write(path, index)
+    >>> bank = ScenarioBank(path)
+    >>> len(bank), bank[0] == index[0], bank.resolve(0) == index.resolve(0)
+    (849, True, True)
+    >>> bank.rules() == index.rules()
+    True
+    >>> bank.close()
+    """
+
+    def __init__(self, path=BANK):
+        with open(path, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._read_header(path)
+        except (ValueError, struct.error):
+            self.close()
+            raise
+
+    def _read_header(self, path):
+        try:
+            magic, version, count, reason_count = \
+                HEADER.unpack_from(self._data)
+        except struct.error:
+            raise ValueError(f'{path} is not a scenario bank!')
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a scenario bank!')
+        if version != VERSION:
+            raise ValueError(f'Scenario bank version {version} '
+                             f'not supported!')
+
+        offset = HEADER.size
+        self.reasons = []
+        for _ in range(reason_count):
+            length, = REASON.unpack_from(self._data, offset)
+            offset += REASON.size
+            text = self._data[offset:offset + length].decode('utf-8')
+            self.reasons.append(text or None)
+            offset += length
+
+        self._records = offset
+        self._count = count
+        if len(self._data) != offset + count * RECORD.size:
+            raise ValueError(f'{path} is truncated!')
+
+        # Only what sampling and training need is read up front
+        self._intersection_ids = array('H')
+        self._rules = array('B')
+        self._buckets = {}
+        for scenario_id in range(count):
+            control, intersection_id, rule, roads = RECORD.unpack_from(
+                self._data, self._offset(scenario_id)
+            )[:4]
+            self._intersection_ids.append(intersection_id)
+            self._rules.append(rule)
+            self._buckets.setdefault(
+                (self._roads(roads), control_types[control]), []
+            ).append(scenario_id)
+
+    def close(self):
+        self._data.close()
+
+    def _offset(self, scenario_id):
+        if not 0 <= scenario_id < self._count:
+            raise IndexError(f'No scenario {scenario_id}!')
+        return self._records + scenario_id * RECORD.size
+
+    @staticmethod
+    def _roads(mask):
+        return tuple(road for slot, road in enumerate(slots)
+                     if mask >> slot & 1)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, scenario_id):
+        control, _, _, roads, right_of_way, _, targets, *reasons = \
+            RECORD.unpack_from(self._data, self._offset(scenario_id))
+
+        prios = []
+        cars = []
+        for slot, road in enumerate(slots):
+            if not roads >> slot & 1:
+                continue
+            prios.append((road, bool(right_of_way >> slot & 1)))
+            if reasons[slot] != NO_CAR:
+                cars.append((road, slots[targets >> 2 * slot & 3]))
+
+        return Scenario(control_types[control], tuple(prios), tuple(cars))
+
+    def resolve(self, scenario_id):
+        _, _, _, _, _, yields, _, *reasons = \
+            RECORD.unpack_from(self._data, self._offset(scenario_id))
+
+        return {
+            road: (bool(yields >> slot & 1), self.reasons[reasons[slot]])
+            for slot, road in enumerate(slots) if reasons[slot] != NO_CAR
+        }
+
+    def rules(self):
+        return array('B', self._rules)
+
+
+def load(path=BANK):
+    """
+        The scenario bank if it can be read, otherwise the scenarios
+    resolved now; returns (scenarios, problem with the bank or None).
+    """
+
+    try:
+        return ScenarioBank(path), None
+    except (OSError, ValueError) as e:
+        return ScenarioIndex(), e
+
+
+def check(path=BANK):
+    """
+        Compare a bank with the scenarios resolved now.
+
+        Returns a list of problems (empty if the bank is up to date).
+    """
+
+    try:
+        bank = ScenarioBank(path)
+    except (OSError, ValueError) as e:
+        return [str(e)]
+
+    index = ScenarioIndex()
+    problems = []
+    if len(bank) != len(index):
+        problems.append(f'{len(bank)} scenarios instead of {len(index)}')
+    bank_rules, index_rules = bank.rules(), index.rules()
+    for scenario_id in range(min(len(bank), len(index))):
+        if bank[scenario_id] != index[scenario_id]:
+            problems.append(f'Scenario {scenario_id} differs')
+        elif bank.resolve(scenario_id) != index.resolve(scenario_id):
+            problems.append(f'Verdicts of scenario {scenario_id} differ')
+        elif bank_rules[scenario_id] != index_rules[scenario_id]:
+            problems.append(f'Rule of scenario {scenario_id} differs')
+    bank.close()
+
+    return problems
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description='Resolve every scenario into a bank file for the game'
+    )
+    parser.add_argument('--output', default=BANK)
+    parser.add_argument(
+        '--check', action='store_true',
+        help='only check that the bank is up to date'
+    )
+    args = parser.parse_args(argv)
+
+    if args.check:
+        problems = check(args.output)
+        for problem in problems[:10]:
+            print(problem)
+        if problems:
+            sys.exit(f'{args.output} is out of date; '
+                     f'run python scenario_bank.py')
+        print(f'{args.output} is up to date.')
+    else:
+        write(args.output)
+        print(f'Wrote {args.output} '
+              f'({os.path.getsize(args.output)} bytes).')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Every situation the game can show, enumerated up front.
+#
+# A scenario is: which roads exist, how the intersection is controlled,
+# which roads have right-of-way, and where every car wants to go.
+# The player is always the car coming from 'behind'.
+
+from array import array
+from collections import namedtuple
+from itertools import combinations, product
+import random
+
+from training import player_rule
+from yield_resolver import (
+    directions, _canonical_scenario, _resolve_canonical
+)
+
+
+# Roads other than the player's, in the order they are drawn
+side_roads = ['left', 'ahead', 'right']
+
+# How the intersection is controlled, and how often we want each
+control_types = ['uncontrolled', 'yield-sign-only', 'controlled']
+control_weights = [1, 2, 3]
+
+# Pairs of opposite roads; a yield-sign-only intersection gives one of them
+# right-of-way
+opposites = [{'behind', 'ahead'}, {'left', 'right'}]
+
+Scenario = namedtuple('Scenario', ['control_type', 'prios', 'cars'])
+Scenario.__doc__ = """
+    control_type : one of `control_types`
+    prios : tuple of (road, right-of-way) pairs; the first road is 'behind'
+    cars : tuple of (source road, target road) pairs, same order as prios
+"""
+
+
+def road_layouts():
+    """
+    The roads of every intersection shape: a crossroads,
+    or a T missing one of the side roads.
+
+    >>> road_layouts()
+    [('behind', 'left', 'ahead', 'right'), ('behind', 'ahead', 'right'), ('behind', 'left', 'right'), ('behind', 'left', 'ahead')]
+    """
+
+    layouts = [tuple(['behind'] + side_roads)]
+    for missing in side_roads:
+        layouts.append(
+            tuple(['behind'] + [road for road in side_roads if road != missing])
+        )
+    return layouts
+
+
+def prio_layouts(roads, control_type):
+    """
+    Every choice of roads with right-of-way, for a given control type
+
+    >>> [sorted(prio) for prio in
+    ...     prio_layouts(('behind', 'left', 'right'), 'yield-sign-only')]
+    [['left', 'right']]
+    >>> len(prio_layouts(('behind', 'left', 'ahead', 'right'), 'controlled'))
+    6
+    """
+
+    if control_type == 'uncontrolled':
+        return [frozenset()]
+    elif control_type == 'yield-sign-only':
+        # Both roads in the pair must exist
+        return [
+            frozenset(pair) for pair in opposites
+            if pair.issubset(roads)
+        ]
+    elif control_type == 'controlled':
+        return [frozenset(pair) for pair in combinations(roads, 2)]
+
+    raise ValueError(f'Control type {control_type} not valid!')
+
+
+def car_layouts(roads):
+    """
+    Every choice of targets, for one car on each road (no U-turns)
+
+    >>> len(list(car_layouts(('behind', 'left', 'ahead', 'right'))))
+    81
+    >>> next(car_layouts(('behind', 'left', 'right')))
+    (('behind', 'left'), ('left', 'behind'), ('right', 'behind'))
+    """
+
+    targets = [[target for target in roads if target != road] for road in roads]
+    for chosen in product(*targets):
+        yield tuple(zip(roads, chosen))
+
+
+def enumerate_scenarios():
+    """
+    Every scenario the game can show
+
+    >>> scenarios = list(enumerate_scenarios())
+    >>> len(scenarios), len(set(scenarios))
+    (849, 849)
+    >>> scenarios[0]
+    Scenario(control_type='uncontrolled', prios=(('behind', False), ('left', False), ('ahead', False), ('right', False)), cars=(('behind', 'left'), ('left', 'behind'), ('ahead', 'behind'), ('right', 'behind')))
+    """
+
+    for roads in road_layouts():
+        for control_type in control_types:
+            for prio_roads in prio_layouts(roads, control_type):
+                prios = tuple((road, road in prio_roads) for road in roads)
+                for cars in car_layouts(roads):
+                    yield Scenario(control_type, prios, cars)
+
+
+class ScenarioIndex:
+    """
+        All scenarios, with every car's verdict computed once.
+
+        Scenarios which are rotations of each other share their verdicts:
+    only one canonical intersection is resolved for all of them.
+    """
+
+    _layouts = road_layouts()
+    # A crossroads half the time, otherwise any of the T shapes
+    _layout_weights = [3] + [1] * (len(_layouts) - 1)
+
+    def __init__(self):
+        self.scenarios = []
+        self.intersections = []  # Canonical, rotation-free descriptions
+        self.verdicts = []  # Per canonical intersection, one per slot
+
+        # Per scenario: which canonical intersection, and rotated how
+        self._intersection_ids = array('H')
+        self._rotations = array('B')
+
+        # Scenario ids per (road layout, control type), for sampling
+        self._buckets = {}
+
+        intersection_ids = {}
+        for scenario in enumerate_scenarios():
+            canonical, rotation = _canonical_scenario(
+                dict(scenario.prios), dict(scenario.cars)
+            )
+            if canonical not in intersection_ids:
+                intersection_ids[canonical] = len(self.intersections)
+                self.intersections.append(canonical)
+                self.verdicts.append(_resolve_canonical(canonical))
+
+            roads = tuple(road for road, _ in scenario.prios)
+            self._buckets.setdefault(
+                (roads, scenario.control_type), []
+            ).append(len(self.scenarios))
+
+            self.scenarios.append(scenario)
+            self._intersection_ids.append(intersection_ids[canonical])
+            self._rotations.append(rotation)
+
+    def __len__(self):
+        return len(self.scenarios)
+
+    def __getitem__(self, scenario_id):
+        return self.scenarios[scenario_id]
+
+    def resolve(self, scenario_id):
+        """
+            The (must_yield, reason) of every car in a scenario,
+        by source road.
+
+        >>> index = ScenarioIndex()
+        >>> index.resolve(0)['behind']
+        (True, 'The car on your right has the same right-of-way status,\\nand you have to yield.')
+        """
+
+        intersection_id = self._intersection_ids[scenario_id]
+        rotation = self._rotations[scenario_id]
+
+        return {
+            directions[(slot + rotation) % 4]: verdict
+            for slot, verdict in enumerate(self.verdicts[intersection_id])
+            if verdict is not None
+        }
+
+    def rules(self):
+        """
+            The rule of the README (see training.rules) deciding the player's
+        verdict, by scenario id
+
+        >>> ScenarioIndex().rules()[:4]
+        array('B', [4, 4, 4, 4])
+        """
+
+        return array('B', (
+            player_rule(scenario, self.resolve(scenario_id)['behind'])
+            for scenario_id, scenario in enumerate(self.scenarios)
+        ))
+
+    def sample(self, rng=random):
+        """
+            Pick a scenario id with the same odds the game always had:
+        3 or 4 roads evenly, controlled intersections more often,
+        and everything else uniformly.
+        """
+
+        roads = rng.choices(self._layouts, weights=self._layout_weights)[0]
+        control_type = rng.choices(
+            control_types, weights=control_weights
+        )[0]
+
+        return rng.choice(self._buckets[(roads, control_type)])
+
+    def odds(self):
+        """
+        The probability of `sample` picking each scenario id
+
+        >>> odds = ScenarioIndex().odds()
+        >>> round(sum(odds), 9), round(max(odds) / min(odds), 1)
+        (1.0, 13.5)
+        """
+
+        layout_total = sum(self._layout_weights)
+        control_total = sum(control_weights)
+
+        odds = [0.0] * len(self)
+        for (roads, control_type), ids in self._buckets.items():
+            layout_weight = self._layout_weights[self._layouts.index(roads)]
+            control_weight = control_weights[control_types.index(control_type)]
+            chance = (layout_weight / layout_total) * \
+                (control_weight / control_total) / len(ids)
+            for scenario_id in ids:
+                odds[scenario_id] = chance
+        return odds
+
+    def report(self):
+        """
+        How many distinct situations there are
+
+        >>> print(ScenarioIndex().report())
+        Scenarios: 849
+          uncontrolled: 105
+          yield-sign-only: 186
+          controlled: 558
+        Distinct intersections (up to rotation): 182
+        """
+
+        lines = [f'Scenarios: {len(self)}']
+        for control_type in control_types:
+            count = sum(
+                len(ids) for (_, kind), ids in self._buckets.items()
+                if kind == control_type
+            )
+            lines.append(f'  {control_type}: {count}')
+        lines.append(
+            'Distinct intersections (up to rotation): '
+            f'{len(set(self._intersection_ids))}'
+        )
+
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    print(ScenarioIndex().report())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from time import time
+
+from kivy.clock import Clock
+
+
+class FrameScheduler:
+    """
+        Calls `update` at `fps` frames per second, but only while
+    `is_animating()` says something moves. Otherwise it sleeps until woken
+    (i.e. by a touch, or a new turn), to save the phone's battery.
+
+        Counts the frames it ran, and the ones it skipped while asleep.
+    """
+
+    def __init__(self, update, is_animating, fps=40):
+        self.update = update
+        self.is_animating = is_animating
+        self.fps = fps
+
+        self.frames_rendered = 0
+        self._frames_skipped = 0
+        self._event = None
+        self._asleep_since = time()
+
+    @property
+    def running(self):
+        return self._event is not None
+
+    @property
+    def frames_skipped(self):
+        skipped = self._frames_skipped
+        if not self.running:
+            skipped += int((time() - self._asleep_since) * self.fps)
+        return skipped
+
+    def wake(self, *_):
+        """Run frames again, until nothing animates anymore"""
+        if self.running:
+            return
+
+        self._frames_skipped = self.frames_skipped
+        self._event = Clock.schedule_interval(self._frame, 1.0/self.fps)
+
+    def _frame(self, seconds_since_last_update):
+        self.update(seconds_since_last_update)
+        self.frames_rendered += 1
+
+        if not self.is_animating():
+            self._event = None
+            self._asleep_since = time()
+            return False  # Unschedules us
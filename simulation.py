@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# The game without the graphics: scenarios, decisions and score.
+# Does not need Kivy, so it can run in tests and batch tools.
+
+import random
+
+from scenarios import ScenarioIndex
+
+
+def explain_verdict(must_yield, reason):
+    """
+    Give a reason even when we don't have to yield
+
+    >>> explain_verdict(False, None)
+    (False, "Other cars either won't cross your path,\\nnor need to yield to you.")
+    """
+    if must_yield:
+        return must_yield, reason
+
+    # We don't have to yield to anyone in the intersection
+    return False, \
+        "Other cars either won't cross your path,\nnor need to yield to you."
+
+
+class Turn:
+    """One intersection, and what the player did in it"""
+
+    def __init__(self, scenarios, scenario_id):
+        self.scenario_id = scenario_id
+        self.scenario = scenarios[scenario_id]
+
+        self.type = self.scenario.control_type
+        self.prios = dict(self.scenario.prios)
+        self.targets = dict(self.scenario.cars)  # By source road
+        self.verdicts = {
+            road: explain_verdict(*verdict)
+            for road, verdict in scenarios.resolve(scenario_id).items()
+        }
+
+        self.player_move = None  # 'go' or 'stop'
+        self.correct = None  # Player moved correctly
+
+    @property
+    def must_yield(self):
+        """Whether the player (coming from behind) has to yield"""
+        return self.verdicts['behind'][0]
+
+    @property
+    def reason(self):
+        return self.verdicts['behind'][1]
+
+    def decide(self, move):
+        """
+        Record the player's move ('go' or 'stop'); returns whether it's right
+        """
+        if move not in ('go', 'stop'):
+            raise ValueError(f'Move {move} not valid!')
+
+        self.player_move = move
+        self.correct = (move == 'stop') == self.must_yield
+        return self.correct
+
+
+class Simulation:
+    """
+        Deal intersections one after another, and keep the score.
+
+    >>> simulation = Simulation(rng=random.Random(1))
+    >>> turn = simulation.turn
+    >>> turn.decide('stop' if turn.must_yield else 'go')
+    True
+    >>> _ = simulation.next_turn()
+    >>> simulation.score
+    1
+    """
+
+    def __init__(self, scenarios=None, rng=random, trainer=None):
+        """
+        trainer : a training.Trainer, to deal the rules the player gets
+        wrong more often; the game's usual odds if None
+        """
+        self.scenarios = scenarios or ScenarioIndex()
+        self.rng = rng
+        self.trainer = trainer
+        self.score = 0
+        self.turn = self._deal()
+        self.upcoming = None  # Turn dealt ahead of time by `prepare`
+        self._learned = False  # Whether the trainer saw the current turn
+
+    def _deal(self):
+        if self.trainer:
+            scenario_id = self.trainer.sample(self.rng)
+        else:
+            scenario_id = self.scenarios.sample(self.rng)
+        return Turn(self.scenarios, scenario_id)
+
+    def _learn(self):
+        """Tell the trainer how the current turn went, once"""
+        if self.trainer and not self._learned and \
+                self.turn.correct is not None:
+            self.trainer.record(self.turn.scenario_id, self.turn.correct)
+            self._learned = True
+
+    def prepare(self):
+        """
+            Deal the next turn ahead of time (i.e. while the player reads
+        the result), so that `next_turn` only has to swap it in.
+
+        >>> simulation = Simulation(rng=random.Random(1))
+        >>> upcoming = simulation.prepare()
+        >>> simulation.prepare() is upcoming
+        True
+        >>> _ = simulation.turn.decide('go')
+        >>> simulation.next_turn() is upcoming
+        True
+        """
+        if self.upcoming is None:
+            # The answer to this turn decides what comes next
+            self._learn()
+            self.upcoming = self._deal()
+        return self.upcoming
+
+    def next_turn(self):
+        """Score the finished turn, and start a new one"""
+        if self.turn.correct is None:
+            raise ValueError('The player has not moved yet!')
+
+        self._learn()
+        if self.turn.correct:
+            self.score += 1
+        else:
+            self.score = 0
+
+        self.turn = self.prepare()
+        self.upcoming = None
+        self._learned = False
+        return self.turn
+
+
+def autoplay(simulation, turns, player=None):
+    """
+        Play a number of turns without any graphics.
+
+        player : function picking 'go' or 'stop' for a Turn;
+    guesses randomly by default
+
+        Returns how many turns were answered correctly.
+
+    >>> autoplay(Simulation(rng=random.Random(1)), 1000,
+    ...          lambda turn: 'stop' if turn.must_yield else 'go')
+    1000
+    """
+
+    if player is None:
+        def player(turn):
+            return simulation.rng.choice(['go', 'stop'])
+
+    correct = 0
+    for _ in range(turns):
+        correct += simulation.turn.decide(player(simulation.turn))
+        simulation.next_turn()
+
+    return correct
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
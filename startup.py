@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Show the first intersection as soon as possible, and load the rest later.
+
+import threading
+from time import perf_counter
+
+from kivy.logger import Logger
+
+
+class PhaseTimer:
+    """Logs how long each phase of startup took"""
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.last = self.start
+        self.phases = []  # (name, seconds) pairs
+
+    def mark(self, name):
+        """The phase called `name` just ended"""
+        now = perf_counter()
+        self.phases.append((name, now - self.last))
+        Logger.info(
+            f'Startup: {name} took {(now - self.last)*1000:.0f} ms '
+            f'({(now - self.start)*1000:.0f} ms since start)'
+        )
+        self.last = now
+
+
+class AssetLoader(threading.Thread):
+    """
+        Runs loading jobs one after another, in the given order,
+    on a background thread.
+
+        jobs : list of (name, function) pairs
+    """
+
+    def __init__(self, jobs):
+        threading.Thread.__init__(self, name='AssetLoader', daemon=True)
+        self.jobs = jobs
+
+    def run(self):
+        for name, job in self.jobs:
+            start = perf_counter()
+            try:
+                job()
+            except Exception as e:
+                Logger.warning(f'Assets: Could not load {name}: {e}')
+                continue
+
+            Logger.info(
+                f'Assets: Loaded {name} in the background '
+                f'in {(perf_counter() - start)*1000:.0f} ms'
+            )
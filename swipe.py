@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# The player's swipe in one turn, as a state machine:
+#
+#   waiting --down--> choosing --past the threshold--> decided --up--> shown
+#      ^                 |                                              |
+#      +---up (a tap)----+                     up: the next turn <------+
+#
+# Only the finger which started the swipe decides the move; once decided,
+# lifting any finger shows the result (the deciding one may have been lifted
+# where the game ignores it, i.e. over the status bar). Does not need Kivy.
+
+# What `Swipe.up` asks for
+HINT = 'hint'  # A tap: show how to play
+SHOW = 'show'  # The move is final: show the result
+NEXT = 'next'  # The result was seen: go to the next turn
+
+
+class Swipe:
+    """
+        Turns touches into one move, 'go' (up) or 'stop' (down), decided
+    exactly once: when the finger first goes `threshold` pixels away from
+    where it touched. Moving back afterwards changes nothing.
+
+        Until then, the finger drags the player's car; `drag` gives how far,
+    once per frame, however many touch events came in between.
+
+        Timestamps are up to the caller (the game passes its clock).
+
+    >>> swipe = Swipe(threshold=10)
+    >>> swipe.down(finger=1, y=100)
+    >>> swipe.move(finger=1, y=104, timestamp=2.0), swipe.drag()
+    (None, 4)
+    >>> swipe.move(finger=1, y=112, timestamp=2.5)
+    'go'
+    >>> swipe.move(finger=1, y=80, timestamp=2.6)
+    >>> swipe.state, swipe.decision, swipe.decided_at, swipe.drag()
+    ('decided', 'go', 2.5, 8)
+    >>> swipe.up(finger=1), swipe.up(finger=1)
+    ('show', 'next')
+
+    If the deciding finger's lift is missed, the next tap shows the result
+    >>> swipe = Swipe(threshold=10)
+    >>> swipe.down(finger=1, y=500)
+    >>> swipe.move(finger=1, y=900, timestamp=1.0)
+    'go'
+    >>> swipe.up(finger=1, ignored=True)
+    >>> swipe.down(finger=3, y=300)
+    >>> swipe.up(finger=3), swipe.state
+    ('show', 'shown')
+
+    An ignored lift before deciding lets the next finger start again
+    >>> swipe = Swipe(threshold=10)
+    >>> swipe.down(finger=1, y=500)
+    >>> swipe.up(finger=1, ignored=True)
+    >>> swipe.down(finger=2, y=300)
+    >>> swipe.move(finger=2, y=200, timestamp=1.0)
+    'stop'
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.state = 'waiting'
+        self.finger = None
+        self.decision = None  # 'go' or 'stop'
+        self.decided_at = None  # Timestamp of the touch event deciding it
+
+        self._start_y = None
+        self._latest_y = None
+        self._dragged_y = None
+
+    @property
+    def started(self):
+        """Whether a finger has touched (and cars wait for the player)"""
+        return self.state != 'waiting'
+
+    def down(self, finger, y):
+        if self.state == 'waiting':
+            self.state = 'choosing'
+            self.finger = finger
+            self._start_y = self._latest_y = self._dragged_y = y
+
+    def move(self, finger, y, timestamp):
+        """Returns the move, if this touch event decided it; otherwise None"""
+        if self.state != 'choosing' or finger != self.finger:
+            return None
+
+        self._latest_y = y
+        if y - self._start_y > self.threshold:
+            self.decision = 'go'
+        elif self._start_y - y > self.threshold:
+            self.decision = 'stop'
+        else:
+            return None
+
+        self.state = 'decided'
+        self.decided_at = timestamp
+        return self.decision
+
+    def drag(self):
+        """How far the finger moved the car since the last frame"""
+        if not self.started:
+            return 0
+
+        distance = self._latest_y - self._dragged_y
+        self._dragged_y = self._latest_y
+        return distance
+
+    def up(self, finger, ignored=False):
+        """
+            Returns what lifting the finger asks for: HINT, SHOW, NEXT or None.
+
+            ignored : the game does not act on this lift (i.e. it was over
+        the status bar); the swipe only forgets the finger, if it was choosing
+        """
+        if ignored:
+            if self.state == 'choosing' and finger == self.finger:
+                self.state = 'waiting'
+                self.finger = None
+            return None
+
+        if self.state == 'shown':
+            # Any finger moves on
+            return NEXT
+        if self.state == 'decided':
+            self.state = 'shown'
+            return SHOW
+        if self.state == 'choosing' and finger == self.finger:
+            self.state = 'waiting'
+            self.finger = None
+            return HINT
+        return None
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+from kivy.atlas import Atlas
+from kivy.clock import Clock
+from kivy.core.image import Image as CoreImage
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import Color, Rectangle
+from kivy.logger import Logger
+from kivy.properties import ListProperty, NumericProperty, StringProperty
+from kivy.uix.widget import Widget
+
+
+def pick_atlas(atlases, sprite_size):
+    """
+        From the atlases in pics/assets.json (by sprite size), pick the one
+    with the smallest sprites still at least sprite_size pixels large
+    (or the largest sprites, if none is large enough).
+
+    >>> atlases = {'128': 'a-128.atlas', '256': 'a-256.atlas', '512': 'a.atlas'}
+    >>> pick_atlas(atlases, 200)
+    'a-256.atlas'
+    >>> pick_atlas(atlases, 900)
+    'a.atlas'
+    """
+
+    sizes = sorted(int(size) for size in atlases)
+    for size in sizes:
+        if size >= sprite_size:
+            return atlases[str(size)]
+    return atlases[str(sizes[-1])]
+
+
+class TextureRegistry:
+    """
+        Hands out sprite textures by name (the PNG name without extension,
+    i.e. 'car_signal_left' or 'sign-prio-ahead').
+
+        All sprites are loaded at once from an atlas built by
+    pics/build_assets.py (on the first request, or by calling `load`),
+    so swapping a texture never touches the disk. If pics/assets.json
+    lists atlases of several sizes, the smallest one fitting the screen
+    is used (see `fit` for when the screen changes size).
+    Sprites missing from the atlas are loaded from pics/pngs once.
+
+        Textures can only be loaded once the window exists (i.e. not in
+    App.build).
+    """
+
+    def __init__(self, manifest='pics/assets.json',
+                 atlas='pics/sprites.atlas', png_dir='pics/pngs'):
+        self.manifest = manifest
+        self.atlas = atlas  # When there is no manifest
+        self.png_dir = png_dir
+        self.textures = None
+
+    def _choose_atlas(self, sprite_size):
+        try:
+            with open(self.manifest) as f:
+                atlases = json.load(f)['atlases']
+        except (IOError, ValueError, KeyError):
+            return
+
+        self.atlas = os.path.join(
+            os.path.dirname(self.manifest), pick_atlas(atlases, sprite_size)
+        )
+
+    def load(self, sprite_size=None):
+        """
+        Load the textures; sprite_size is how large (in pixels) the
+        largest sprites are drawn
+        """
+        if self.textures is not None:
+            return
+
+        if sprite_size:
+            self._choose_atlas(sprite_size)
+
+        try:
+            self.textures = dict(Atlas(self.atlas).textures)
+        except (IOError, ValueError):
+            Logger.warning(f'Textures: No atlas at {self.atlas}, using PNGs')
+            self.textures = {}
+
+    def fit(self, sprite_size):
+        """
+            Switch to the atlas for the new sprite_size (i.e. when the window
+        is resized), if it is another one. Returns whether the textures
+        changed; sprites showing the old ones must be given the new ones.
+        """
+        if self.textures is None:
+            return False
+
+        atlas = self.atlas
+        self._choose_atlas(sprite_size)
+        if self.atlas == atlas:
+            return False
+
+        self.textures = None
+        self.load()
+        return True
+
+    def __getitem__(self, name):
+        if self.textures is None:
+            self.load()
+
+        try:
+            return self.textures[name]
+        except KeyError:
+            path = os.path.join(self.png_dir, f'{name}.png')
+            texture = CoreImage(path).texture
+            self.textures[name] = texture
+            return texture
+
+
+# How many rendered texts to keep; the game shows only a handful
+label_cache_size = 32
+
+
+@lru_cache(maxsize=label_cache_size)
+def render_text(text, font_size, text_size, color, outline_width,
+                outline_color):
+    """
+        Rasterize a text, with its outline (slow), once per distinct look.
+    All arguments must be hashable (i.e. tuples instead of lists).
+    """
+    label = CoreLabel(
+        text=text, font_size=font_size, text_size=text_size, color=color,
+        outline_width=outline_width, outline_color=outline_color
+    )
+    label.refresh()
+    return label.texture
+
+
+class CachedLabel(Widget):
+    """
+        Shows a text centered on itself, like a Label, but takes the
+    texture from `render_text`, so texts shown before are not drawn again.
+    """
+
+    text = StringProperty('')
+    font_size = NumericProperty(15)
+    text_size = ListProperty([None, None])
+    color = ListProperty([1, 1, 1, 1])
+    outline_width = NumericProperty(0)
+    outline_color = ListProperty([0, 0, 0, 1])
+
+    def __init__(self, **kwargs):
+        # Many properties change at once; look up the texture once per frame
+        self._trigger_texture = Clock.create_trigger(self.texture_update, -1)
+
+        Widget.__init__(self, **kwargs)
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.rect = Rectangle(size=(0, 0))
+
+        self.bind(
+            text=self._trigger_texture, font_size=self._trigger_texture,
+            text_size=self._trigger_texture, color=self._trigger_texture,
+            outline_width=self._trigger_texture,
+            outline_color=self._trigger_texture,
+            center=self._place
+        )
+        self._trigger_texture()
+
+    def texture_update(self, *_):
+        if not self.text:
+            self.rect.texture = None
+            self.rect.size = (0, 0)
+            return
+
+        self.rect.texture = render_text(
+            self.text, self.font_size, tuple(self.text_size),
+            tuple(self.color), self.outline_width, tuple(self.outline_color)
+        )
+        self.rect.size = self.rect.texture.size
+        self._place()
+
+    def _place(self, *_):
+        width, height = self.rect.size
+        self.rect.pos = (int(self.center_x - width / 2),
+                         int(self.center_y - height / 2))
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Show the rules the player gets wrong more often, like flash cards:
+# every rule of the README sits in a Leitner box; a mistake sends it to the
+# first box (shown often), and right answers move it up, one box at a time.
+# Does not need Kivy.
+
+import random
+
+from yield_resolver import (
+    must_yield, paths_intersect, relative_position, signal_turn
+)
+
+# The rules in the README, by number
+rules = {
+    1: 'Nobody crosses your path',
+    2: 'Right-of-way signs',
+    3: 'Yield signs',
+    4: 'Yield to the car on your right',
+    5: 'Both turning left',
+}
+
+
+class AliasTable:
+    """
+        Samples indices with the given weights in constant time
+    (Vose's alias method); building it takes linear time.
+
+    >>> table = AliasTable([1, 0, 3])
+    >>> rng = random.Random(0)
+    >>> counts = [0, 0, 0]
+    >>> for _ in range(4000):
+    ...     counts[table.sample(rng)] += 1
+    >>> counts[1], round(counts[2] / counts[0])
+    (0, 3)
+    """
+
+    def __init__(self, weights):
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+
+        self.probabilities = [1.0] * count
+        self.aliases = list(range(count))
+
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+
+    def sample(self, rng=random):
+        column = rng.randrange(len(self.aliases))
+        if rng.random() < self.probabilities[column]:
+            return column
+        return self.aliases[column]
+
+
+def player_rule(scenario, verdict):
+    """
+        Which rule of the README decides whether the player (coming from
+    behind) must yield; verdict is the player's (must_yield, reason).
+
+    >>> from scenarios import ScenarioIndex
+    >>> index = ScenarioIndex()
+    >>> player_rule(index[0], index.resolve(0)['behind'])
+    4
+    """
+
+    prios = dict(scenario.prios)
+    turns = {road: signal_turn(road, target) for road, target in scenario.cars}
+    me = turns['behind']
+
+    crossing = [
+        road for road in turns
+        if road != 'behind' and paths_intersect(me, road, turns[road])
+    ]
+    if not crossing:
+        return 1
+
+    sign_rule = 2 if scenario.control_type == 'controlled' else 3
+
+    must, reason = verdict
+    if must:
+        # The car we yield to: the first one making us, starting from the right
+        for road in ['right', 'ahead', 'left']:
+            if road in turns and must_yield(
+                prios['behind'], me, prios[road], turns[road],
+                relative_position('behind', road)
+            )[0]:
+                break
+
+        if prios[road] != prios['behind']:
+            return sign_rule
+        if road == 'ahead' and me == turns[road] == 'sig_left':
+            return 5
+        return 4
+
+    if any(prios[road] != prios['behind'] for road in crossing):
+        return sign_rule
+    return 4
+
+
+class Trainer:
+    """
+        Deals scenarios with the game's usual odds, but more often for
+    rules in lower boxes: a scenario's odds are multiplied by 2 for every
+    box its rule is below the top one.
+
+        Sampling and recording an answer take constant time, no matter how
+    long the player has played: one alias table per rule is built once,
+    and only the small table choosing the rule is rebuilt on an answer.
+
+    >>> from scenarios import ScenarioIndex
+    >>> trainer = Trainer(ScenarioIndex())
+    >>> trainer.record(0, correct=False)
+    >>> trainer.boxes[4], trainer.weight(4) / trainer.weight(1) > 4
+    (0, True)
+    >>> scenario_id = trainer.sample(random.Random(1))
+    """
+
+    boxes_count = 4
+
+    def __init__(self, scenarios):
+        self.scenarios = scenarios
+        self.rules = sorted(rules)
+
+        odds = scenarios.odds()
+        self.rule_of = scenarios.rules()  # By scenario id
+        self._members = {rule: [] for rule in self.rules}
+        for scenario_id, rule in enumerate(self.rule_of):
+            self._members[rule].append(scenario_id)
+
+        # With every rule in the top box, the game's usual odds
+        self._base = {
+            rule: sum(odds[i] for i in members)
+            for rule, members in self._members.items()
+        }
+        self._within = {
+            rule: AliasTable([odds[i] for i in members])
+            for rule, members in self._members.items() if members
+        }
+
+        self.boxes = {rule: self.boxes_count - 1 for rule in self.rules}
+        self.answers = {rule: [0, 0] for rule in self.rules}  # Right, wrong
+        self._update()
+
+    def weight(self, rule):
+        """How likely the rule comes up next (not normalized)"""
+        return self._base[rule] * 2 ** (self.boxes_count - 1 - self.boxes[rule])
+
+    def _update(self):
+        self._present = [rule for rule in self.rules if self._base[rule]]
+        self._choose_rule = AliasTable(
+            [self.weight(rule) for rule in self._present]
+        )
+
+    def sample(self, rng=random):
+        """Pick the next scenario id"""
+        rule = self._present[self._choose_rule.sample(rng)]
+        return self._members[rule][self._within[rule].sample(rng)]
+
+    def record(self, scenario_id, correct):
+        """Move the scenario's rule up a box if answered right, else down"""
+        rule = self.rule_of[scenario_id]
+        self.answers[rule][0 if correct else 1] += 1
+
+        if correct:
+            self.boxes[rule] = min(self.boxes[rule] + 1, self.boxes_count - 1)
+        else:
+            self.boxes[rule] = 0
+        self._update()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Yield or Die! Train yourself to learn rules for right-of-way,
+without spending lots of money for practice at driving school!
+Copyright (C) 2021 Dan Gheorghe Haiduc (aka danuker)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Check the resolver against the rules in the README, for every intersection:
+# 3 or 4 roads, any of them with right-of-way, and a car (or none) on each.
+#
+# Besides rule violations, it lists deadlocks (two cars yielding to each
+# other) and intersections where nobody may go. Those are allowed by the
+# rules (i.e. both cars turning left), but good to know about.
+#
+# The report is cached by the hash of yield_resolver.py (and of this file),
+# so running it again without changing the resolver is instant.
+#
+# Usage: python verify_rules.py [--force] [--jobs N] [--examples N]
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, product
+
+import yield_resolver
+from yield_resolver import (
+    directions, must_yield, paths_intersect, relative_position,
+    resolve_intersection, signal_turn, _verify_decision_table
+)
+
+CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                     '.verify_rules_cache.json')
+
+# Findings which mean the resolver breaks a rule, or contradicts itself
+errors = ['inconsistent', 'rule 1', 'rule 2/3', 'rule 4', 'rule 5']
+
+# Findings which the rules allow
+notes = ['deadlock', 'nobody may go']
+
+
+def road_sets():
+    """
+    Every set of 3 or 4 roads
+
+    >>> len(road_sets())
+    5
+    """
+    return [
+        roads for size in (3, 4) for roads in combinations(directions, size)
+    ]
+
+
+def shards():
+    """
+    Units of work: a set of roads, and which of them have right-of-way
+
+    >>> len(shards())
+    48
+    """
+    return [
+        (roads, frozenset(prio_roads))
+        for roads in road_sets()
+        for size in range(len(roads) + 1)
+        for prio_roads in combinations(roads, size)
+    ]
+
+
+def car_layouts(roads):
+    """
+    Every choice of cars: on each road, none (None) or one going elsewhere
+
+    >>> len(list(car_layouts(('behind', 'right', 'ahead', 'left'))))
+    255
+    """
+    choices = [[None] + [target for target in roads if target != road]
+               for road in roads]
+    for targets in product(*choices):
+        cars = {road: target for road, target in zip(roads, targets) if target}
+        if cars:
+            yield cars
+
+
+def check(prios, cars):
+    """
+        Check the verdicts of one intersection.
+
+        Returns a list of (kind, road of the car, detail) findings.
+
+    Facing cars both turning left yield to each other (rule 5)
+    >>> prios = {'behind': False, 'right': False, 'ahead': False, 'left': False}
+    >>> check(prios, {'right': 'behind', 'left': 'ahead'})
+    ... # doctest: +NORMALIZE_WHITESPACE
+    [('deadlock', 'right', 'with the car from left'),
+     ('nobody may go', None, '')]
+    """
+
+    verdicts = resolve_intersection(prios, cars)
+    turns = {road: signal_turn(road, target) for road, target in cars.items()}
+
+    findings = []
+    yields_to = {}
+    for road in cars:
+        yields = verdicts[road][0]
+        others = [other for other in cars if other != road]
+        yields_to[road] = set()
+        crossing = []
+        for other in others:
+            position = relative_position(road, other)
+            if must_yield(prios[road], turns[road], prios[other],
+                          turns[other], position)[0]:
+                yields_to[road].add(other)
+            if paths_intersect(turns[road], position, turns[other]):
+                crossing.append(other)
+
+        def violation(kind, detail):
+            findings.append((kind, road, detail))
+
+        # Like Car.must_yield: yield if any other car makes us
+        if yields != bool(yields_to[road]):
+            violation('inconsistent', 'pairwise checks disagree')
+
+        if not crossing and yields:
+            violation('rule 1', 'yields, but crosses nobody')
+
+        if yields and prios[road] and \
+                not any(prios[other] for other in crossing):
+            violation('rule 2/3', 'yields to cars without right-of-way')
+        if not yields and not prios[road] and \
+                any(prios[other] for other in crossing):
+            violation('rule 2/3', 'goes before a car with right-of-way')
+
+        for other in crossing:
+            position = relative_position(road, other)
+            if prios[road] != prios[other] or yields:
+                continue
+            if position == 'right':
+                violation('rule 4', 'goes before the car on the right')
+            if position == 'ahead' and \
+                    turns[road] == turns[other] == 'sig_left':
+                violation('rule 5', 'goes while both turn left')
+
+    for road, other in combinations(cars, 2):
+        if other in yields_to[road] and road in yields_to[other]:
+            findings.append(('deadlock', road, f'with the car from {other}'))
+
+    if len(cars) > 1 and all(verdicts[road][0] for road in cars):
+        findings.append(('nobody may go', None, ''))
+
+    return findings
+
+
+def verify_shard(shard):
+    """Check all car layouts of a shard; runs in a worker process"""
+
+    roads, prio_roads = shard
+    prios = {road: road in prio_roads for road in roads}
+
+    checked = 0
+    findings = []
+    for cars in car_layouts(roads):
+        checked += 1
+        for kind, road, detail in check(prios, cars):
+            findings.append({
+                'kind': kind, 'road': road, 'detail': detail,
+                'prios': prios, 'cars': cars,
+            })
+
+    return checked, findings
+
+
+def source_hash():
+    """Hash of the resolver, and of these checks"""
+    digest = hashlib.sha256()
+    for path in (yield_resolver.__file__, __file__):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def verify(jobs=None):
+    report = {'intersections': 0, 'findings': {}}
+
+    table_errors = _verify_decision_table()
+    if table_errors:
+        report['findings']['inconsistent'] = [
+            {'detail': f'decision table differs for {args}'}
+            for args in table_errors
+        ]
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for checked, findings in pool.map(verify_shard, shards()):
+            report['intersections'] += checked
+            for finding in findings:
+                report['findings'].setdefault(finding['kind'], []).append(
+                    finding
+                )
+
+    return report
+
+
+def print_report(report, examples):
+    print(f'Checked {report["intersections"]} intersections.')
+    for kind in errors + notes:
+        found = report['findings'].get(kind, [])
+        print(f'{kind:14} {len(found):6}')
+        for finding in found[:examples]:
+            print(f'    {finding}')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description='Check the resolver against the rules, exhaustively'
+    )
+    parser.add_argument(
+        '--force', action='store_true',
+        help='verify again, even if the resolver did not change'
+    )
+    parser.add_argument(
+        '--jobs', type=int, help='worker processes (default: one per CPU)'
+    )
+    parser.add_argument(
+        '--examples', type=int, default=3,
+        help='how many findings of each kind to show'
+    )
+    args = parser.parse_args(argv)
+
+    digest = source_hash()
+    try:
+        with open(CACHE) as f:
+            cache = json.load(f)
+    except (IOError, ValueError):
+        cache = {}
+
+    if cache.get('source') == digest and not args.force:
+        print('Resolver unchanged since the last run.')
+        report = cache['report']
+    else:
+        report = verify(jobs=args.jobs)
+        with open(CACHE, 'w') as f:
+            json.dump({'source': digest, 'report': report}, f)
+
+    print_report(report, args.examples)
+
+    if any(report['findings'].get(kind) for kind in errors):
+        sys.exit('The resolver breaks some rules!')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
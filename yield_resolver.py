@@ -19,6 +19,8 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import functools
+
 # Cases:
 
 # Me:
@@ -51,6 +53,9 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # Directions one can go
 directions = ['behind', 'right', 'ahead', 'left']
 
+# Turn signals a car can have
+valid_turns = ['sig_no', 'sig_left', 'sig_right']
+
 # Corners of the intersection one can drive over
 corners = ['near-right', 'far-right', 'far-left', 'near-left']
 ###########
@@ -103,6 +108,43 @@ def _resulting_position(start_index, turn_index):
 
 
 
+def _corner_path(pos_index, turn):
+    """
+        Indices (in the `corners` vector) of the corners driven over
+    when starting from directions[pos_index] and making a turn, in order.
+
+    >>> _corner_path(0, 'sig_no')
+    [0, 1]
+    >>> _corner_path(3, 'sig_left')
+    [3, 0, 1]
+    """
+
+    # Count of needed corners for a given turn
+    needed_count = {'sig_right': 1, 'sig_no': 2, 'sig_left': 3}
+
+    entrance_corner_index = pos_index
+    exit_corner_index_modclass = pos_index + needed_count[turn]
+
+    corner_indices_modclass = \
+        range(entrance_corner_index, exit_corner_index_modclass)
+
+    return [corner % 4 for corner in corner_indices_modclass]
+
+
+# Ordered corners needed for every (start position, turn) pair
+_corner_paths = {
+    (position, turn): _corner_path(pos_index, turn)
+    for pos_index, position in enumerate(directions)
+    for turn in valid_turns
+}
+
+# The same corners, as a 4-bit occupancy mask (bit i is corners[i])
+_corner_masks = {
+    key: sum(1 << corner for corner in path)
+    for key, path in _corner_paths.items()
+}
+
+
 def _needed_corners(start_position, turn):
     """
     Returns the needed segments of the intersecton to make a turn
@@ -117,24 +159,35 @@ def _needed_corners(start_position, turn):
 
     """
 
-    # Count of needed corners for a given turn
-    needed_count = {'sig_right': 1, 'sig_no': 2, 'sig_left': 3}
-
     try:
-        pos_index = directions.index(start_position)
-    except ValueError:
-        raise ValueError(
-            'Relative position {} not valid!'.format(start_position)
-        )
+        path = _corner_paths[(start_position, turn)]
+    except (KeyError, TypeError):
+        if start_position not in directions:
+            raise ValueError(
+                'Relative position {} not valid!'.format(start_position)
+            )
+        raise KeyError(turn)
 
-    entrance_corner_index = pos_index
-    exit_corner_index_modclass = pos_index + needed_count[turn]
+    return [corners[corner_index] for corner_index in path]
 
-    corner_indices_modclass = \
-        range(entrance_corner_index, exit_corner_index_modclass)
 
-    corner_indices = [corner % 4 for corner in corner_indices_modclass]
-    return [corners[corner_index] for corner_index in corner_indices]
+def _needed_corner_mask(start_position, turn):
+    """
+    Same as `_needed_corners`, but as a bitmask over the `corners` vector
+
+    >>> bin(_needed_corner_mask('behind', 'sig_no'))
+    '0b11'
+    >>> bin(_needed_corner_mask('left', 'sig_left'))
+    '0b1011'
+    """
+
+    try:
+        return _corner_masks[(start_position, turn)]
+    except (KeyError, TypeError):
+        # Raises the appropriate error
+        _needed_corners(start_position, turn)
+        raise
+
 
 def relative_position(abs1, abs2):
     """
@@ -164,43 +217,41 @@ def paths_intersect(my_turn, other_relative_position, other_turn):
     True
     """
 
+    my_mask = _needed_corner_mask('behind', my_turn)
+    other_mask = _needed_corner_mask(other_relative_position, other_turn)
+
+    return my_mask & other_mask != 0
+
+
+def _corners_intersect(my_turn, other_relative_position, other_turn):
+    """
+    Same as `paths_intersect`, by corner names instead of masks, to check it
+
+    >>> _corners_intersect('sig_left', 'ahead', 'sig_right')
+    True
+    """
+
     my_needed_corners = _needed_corners('behind', my_turn)
     other_needed_corners = _needed_corners(other_relative_position, other_turn)
 
     return len(set(my_needed_corners).intersection(other_needed_corners)) > 0
 
 
-def must_yield(
+def _must_yield_reference(
         my_right_of_way,
         my_turn,
         other_right_of_way,
         other_turn,
-        other_relative_position
+        other_relative_position,
+        intersect=paths_intersect
         ):
     """
-        Figure out if we have to yield to another specific car.
-        Note: This only checks yielding vs one single car. You have to check
-    all cars in an intersection.
-
-        Returns Boolean (whether we must yield), and String
-    (why we must yield)
-
-    # Must not yield to car from ahead turning left
-    >>> must_yield(False, 'sig_right', False, 'sig_left', 'ahead')
-    (False, None)
-
-    # Must yield to car from right, continuing forward
-    >>> must_yield(True, 'sig_left', True, 'sig_no', 'right')
-    (True, 'The car on your right has right-of-way, and your paths would intersect.')
+    Reference implementation of `must_yield`, written out rule by rule.
+    The decision table is compiled from this function.
 
-    # No need to yield to car from left going straight,
-    # if other car goes out of the right-of-way
-    # (we can tell the ROW bends because I am on his right and have ROW)
-    >>> must_yield(True, 'sig_left', True, 'sig_no', 'left')
-    (False, None)
+    intersect : how to tell whether the two paths cross
     """
 
-    valid_turns = ['sig_no', 'sig_left', 'sig_right']
     if my_turn not in valid_turns:
         raise ValueError(f'My turn {my_turn} not valid turn!')
     if other_turn not in valid_turns:
@@ -235,7 +286,7 @@ def must_yield(
     if my_right_of_way and not other_right_of_way:
         return False, None
 
-    if paths_intersect(my_turn, other_relative_position, other_turn):
+    if intersect(my_turn, other_relative_position, other_turn):
         if not reason:
             reason = 'Your path would intersect with the car from {}.'.format(
                 other_relative_position
@@ -246,6 +297,291 @@ def must_yield(
         return False, None
 
 
+# Set to False to bypass the decision table and use the reference rules
+use_decision_table = True
+
+
+def _build_decision_table():
+    """
+        Run the reference rules over every valid combination of inputs.
+
+        Returns a dict from the `must_yield` arguments (as a tuple) to its
+    result.
+    """
+
+    table = {}
+    for my_right_of_way in (False, True):
+        for my_turn in valid_turns:
+            for other_right_of_way in (False, True):
+                for other_turn in valid_turns:
+                    for position in directions:
+                        args = (
+                            my_right_of_way, my_turn,
+                            other_right_of_way, other_turn,
+                            position
+                        )
+                        table[args] = _must_yield_reference(*args)
+    return table
+
+
+_decision_table = _build_decision_table()
+
+# Every reason must_yield can give, so they can be referred to by index
+reasons = [None] + sorted({
+    reason for _, reason in _decision_table.values() if reason
+})
+
+
+def _verify_decision_table():
+    """
+    List the table entries which disagree with the reference rules,
+    when these find crossing paths by corner names instead of masks.
+
+    >>> len(_decision_table)
+    144
+    >>> _verify_decision_table()
+    []
+
+    The whole table, pinned; this must only change along with the rules:
+
+    >>> import hashlib
+    >>> table = repr(sorted(_decision_table.items())).encode()
+    >>> hashlib.sha256(table).hexdigest()[:16]
+    'b54c8049a6855dce'
+    """
+
+    return [
+        args for args, result in _decision_table.items()
+        if _must_yield_reference(*args, intersect=_corners_intersect) != result
+    ]
+
+
+def must_yield(
+        my_right_of_way,
+        my_turn,
+        other_right_of_way,
+        other_turn,
+        other_relative_position
+        ):
+    """
+        Figure out if we have to yield to another specific car.
+        Note: This only checks yielding vs one single car. You have to check
+    all cars in an intersection.
+
+        Returns Boolean (whether we must yield), and String
+    (why we must yield)
+
+    # Must not yield to car from ahead turning left
+    >>> must_yield(False, 'sig_right', False, 'sig_left', 'ahead')
+    (False, None)
+
+    # Must yield to car from right, continuing forward
+    >>> must_yield(True, 'sig_left', True, 'sig_no', 'right')
+    (True, 'The car on your right has right-of-way, and your paths would intersect.')
+
+    # No need to yield to car from left going straight,
+    # if other car goes out of the right-of-way
+    # (we can tell the ROW bends because I am on his right and have ROW)
+    >>> must_yield(True, 'sig_left', True, 'sig_no', 'left')
+    (False, None)
+    """
+
+    if use_decision_table:
+        try:
+            return _decision_table[(
+                my_right_of_way,
+                my_turn,
+                other_right_of_way,
+                other_turn,
+                other_relative_position
+            )]
+        except (KeyError, TypeError):
+            # Not a precomputed case (i.e. invalid input);
+            # let the reference rules handle (and report) it
+            pass
+
+    return _must_yield_reference(
+        my_right_of_way,
+        my_turn,
+        other_right_of_way,
+        other_turn,
+        other_relative_position
+    )
+
+def signal_turn(source_road, target_road):
+    """
+    Tell the signal
+    >>> signal_turn('left', 'behind')
+    'sig_right'
+    >>> signal_turn('left', 'ahead')
+    'sig_left'
+    >>> signal_turn('left', 'right')
+    'sig_no'
+    >>> signal_turn('right', 'behind')
+    'sig_left'
+    >>> signal_turn('right', 'ahead')
+    'sig_right'
+    >>> signal_turn('behind', 'ahead')
+    'sig_no'
+    >>> signal_turn('ahead', 'left')
+    'sig_right'
+
+    >>> signal_turn('behind', 'behind')
+    Traceback (most recent call last):
+     ...
+    ValueError: U-turns not allowed.
+    """
+
+    directions = ['behind', 'left', 'ahead', 'right']
+    signals = [None, 'sig_left', 'sig_no', 'sig_right']
+
+    source_i = directions.index(source_road)
+    target_i = directions.index(target_road)
+
+    sig_i = (target_i - source_i) % len(signals)
+    sig = signals[sig_i]
+
+    if sig:
+        return sig
+    else:
+        raise ValueError('U-turns not allowed.')
+
+
+# How many canonical intersections to remember the verdicts of
+scenario_cache_size = 4096
+
+
+def _canonical_scenario(prios, cars):
+    """
+        Describe the intersection relative to each of the 4 possible
+    rotations of the world, and pick the smallest description.
+
+        Every road (slot) is described by () if it does not exist, or by
+    its right-of-way and the turn of its car (a number of quarter turns,
+    0 if there is no car).
+
+        Returns the description, and the rotation: slot `i` is the road
+    `directions[(i + rotation) % 4]`.
+
+    Rotating the world gives the same description
+    >>> _canonical_scenario({'behind': True, 'left': False}, {'left': 'behind'})
+    (((), (), (False, 1), (True, 0)), 1)
+    >>> _canonical_scenario({'right': True, 'behind': False}, {'behind': 'right'})
+    (((), (), (False, 1), (True, 0)), 2)
+    """
+
+    for road in cars:
+        if road not in prios:
+            raise ValueError(f'Car from {road} is not on any road!')
+        if cars[road] not in prios:
+            raise ValueError(f'Car to {cars[road]} has no road to go on!')
+
+    slots = []
+    for road in directions:
+        if road not in prios:
+            slots.append(())
+        elif road not in cars:
+            slots.append((bool(prios[road]), 0))
+        else:
+            signal_turn(road, cars[road])  # Refuse U-turns
+            quarter_turns = (
+                directions.index(cars[road]) - directions.index(road)
+            ) % 4
+            slots.append((bool(prios[road]), quarter_turns))
+
+    return min(
+        (tuple(slots[rotation:] + slots[:rotation]), rotation)
+        for rotation in range(4)
+    )
+
+
+@functools.lru_cache(maxsize=scenario_cache_size)
+def _resolve_canonical(scenario):
+    """
+        Resolve every car of a canonical scenario (see `_canonical_scenario`).
+
+        Returns a tuple of (must_yield, reason) per slot, or None for slots
+    without a car.
+    """
+
+    turns = [None, 'sig_right', 'sig_no', 'sig_left']
+
+    verdicts = []
+    for i, slot in enumerate(scenario):
+        if not slot or not slot[1]:
+            verdicts.append(None)
+            continue
+
+        verdict = (False, None)
+        # Look at the other cars, starting with the one on our right
+        for offset in range(1, 4):
+            other = scenario[(i + offset) % 4]
+            if not other or not other[1]:
+                continue
+
+            verdict = must_yield(
+                my_right_of_way=slot[0],
+                my_turn=turns[slot[1]],
+                other_right_of_way=other[0],
+                other_turn=turns[other[1]],
+                other_relative_position=directions[offset]
+            )
+            if verdict[0]:
+                break
+
+        verdicts.append(verdict)
+
+    return tuple(verdicts)
+
+
+def resolve_intersection(prios, cars):
+    """
+        Figure out which cars in an intersection have to yield,
+    checking every car against all the others.
+
+        prios: right-of-way of every road in the intersection,
+    i.e. {'behind': True, 'left': False, ...}
+        cars: target road of the car on each road, i.e. {'behind': 'left'}
+
+        Returns the (must_yield, reason) of every car, by source road.
+    Results are cached (see `resolve_intersection.cache_info()`),
+    and rotating the world does not need a new computation.
+
+    >>> resolve_intersection.cache_clear()
+    >>> prios = {'behind': False, 'left': False, 'right': False}
+    >>> verdicts = resolve_intersection(
+    ...     prios, {'behind': 'left', 'left': 'right', 'right': 'behind'}
+    ... )
+    >>> verdicts['behind']
+    (True, 'The car on your right has the same right-of-way status,\\nand you have to yield.')
+    >>> verdicts['right']
+    (True, 'Your path would intersect with the car from ahead.')
+
+    Same intersection, rotated
+    >>> prios = {'ahead': False, 'left': False, 'behind': False}
+    >>> verdicts = resolve_intersection(
+    ...     prios, {'left': 'ahead', 'behind': 'left', 'ahead': 'behind'}
+    ... )
+    >>> verdicts['behind']
+    (True, 'Your path would intersect with the car from ahead.')
+    >>> resolve_intersection.cache_info()
+    CacheInfo(hits=1, misses=1, maxsize=4096, currsize=1)
+    """
+
+    scenario, rotation = _canonical_scenario(prios, cars)
+    verdicts = _resolve_canonical(scenario)
+
+    return {
+        directions[(slot + rotation) % 4]: verdict
+        for slot, verdict in enumerate(verdicts)
+        if verdict is not None
+    }
+
+
+resolve_intersection.cache_info = _resolve_canonical.cache_info
+resolve_intersection.cache_clear = _resolve_canonical.cache_clear
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()